@@ -0,0 +1,305 @@
+"""Бенчмарк копирования: CopyEngine на синтетических деревьях игр в разных режимах.
+
+Запуск:
+    python bench_copy.py                                   # все профили и режимы во временной папке
+    python bench_copy.py --profiles tiny huge --modes sequential pipeline
+    python bench_copy.py --src E:\\bench --dst D:\\bench     # дерево на флешке, копия на нужный диск
+    python bench_copy.py --output baseline.json            # сохранить результаты
+    python bench_copy.py --baseline baseline.json          # сравнить с сохраненными
+
+Профили деревьев:
+    tiny  — тысячи мелких файлов (конфиги, шейдеры, локализация)
+    huge  — несколько огромных архивов .pak
+    deep  — глубоко вложенные каталоги
+    mixed — смесь, похожая на настоящую игру
+
+Для каждой пары (профиль, режим) CopyEngine запускается в вызывающем потоке
+без Qt, и в JSON выводятся МБ/с, файлов/с, пиковый объем памяти процесса
+(RSS), время этапов scan, copy и verify и число сборок мусора по поколениям.
+С --trace-alloc запуск идет под tracemalloc и записывается пиковый объем
+памяти, выделенной Python-объектами; tracemalloc замедляет копирование,
+поэтому скорость в таком запуске сравнивать не стоит. С --baseline
+результаты сравниваются с сохраненными; если скорость упала больше чем на
+--tolerance, программа завершается с кодом 1.
+
+Исходное дерево после генерации лежит в кэше ОС, поэтому чтение с флешки
+измеряется честно только при --src на самой флешке и после ее переподключения.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import gc
+import argparse
+import platform
+import tempfile
+import threading
+import tracemalloc
+import psutil
+from engine import CopyEngine
+
+
+MB = 1024 * 1024
+
+# Режимы копирования: имя -> параметры CopyEngine
+MODES = {
+    "sequential": {},
+    "parallel": {"workers": 4},
+    "pipeline": {"pipeline": True},
+    "kernel": {"hash_while_copying": False},
+    "durable": {"durability": "file"},
+}
+
+# Как часто замерять память процесса, с
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+def _write_file(path, size, block):
+    """Записывает файл size байт из повторяющегося случайного блока с уникальным началом."""
+    with open(path, "wb") as f:
+        f.write(os.urandom(min(size, 64)))
+        left = size - min(size, 64)
+        while left > 0:
+            n = min(left, len(block))
+            f.write(block[:n])
+            left -= n
+
+
+def make_tiny(root, scale, rng, block):
+    """Тысячи мелких файлов по 1–16 КБ в нескольких десятках каталогов."""
+    for i in range(int(4000 * scale)):
+        folder = os.path.join(root, "Content", f"dir{i % 40:02d}")
+        os.makedirs(folder, exist_ok=True)
+        _write_file(os.path.join(folder, f"asset{i:05d}.uasset"), rng.randint(1024, 16 * 1024), block)
+
+
+def make_huge(root, scale, rng, block):
+    """Несколько больших архивов .pak."""
+    folder = os.path.join(root, "Content", "Paks")
+    os.makedirs(folder, exist_ok=True)
+    for i in range(3):
+        _write_file(os.path.join(folder, f"pakchunk{i}-Windows.pak"), int(256 * MB * scale), block)
+
+
+def make_deep(root, scale, rng, block):
+    """Цепочки вложенных каталогов глубиной 24 с небольшими файлами на каждом уровне."""
+    for chain in range(max(1, int(20 * scale))):
+        folder = os.path.join(root, f"chain{chain:02d}")
+        for level in range(24):
+            folder = os.path.join(folder, f"level{level:02d}")
+            os.makedirs(folder, exist_ok=True)
+            for i in range(3):
+                _write_file(os.path.join(folder, f"file{i}.bin"), rng.randint(4 * 1024, 128 * 1024), block)
+
+
+def make_mixed(root, scale, rng, block):
+    """Смесь, похожая на настоящую игру: архивы, средние ресурсы, мелкие файлы и бинарники."""
+    make_tiny(os.path.join(root, "Engine"), scale / 4, rng, block)
+    paks = os.path.join(root, "Game", "Content", "Paks")
+    os.makedirs(paks, exist_ok=True)
+    _write_file(os.path.join(paks, "pakchunk0-Windows.pak"), int(192 * MB * scale), block)
+    movies = os.path.join(root, "Game", "Content", "Movies")
+    os.makedirs(movies, exist_ok=True)
+    for i in range(max(1, int(30 * scale))):
+        _write_file(os.path.join(movies, f"movie{i:02d}.bk2"), rng.randint(1 * MB, 8 * MB), block)
+    binaries = os.path.join(root, "Game", "Binaries", "Win64")
+    os.makedirs(binaries, exist_ok=True)
+    for i in range(10):
+        _write_file(os.path.join(binaries, f"module{i}.dll"), rng.randint(100 * 1024, 4 * MB), block)
+
+
+PROFILES = {
+    "tiny": make_tiny,
+    "huge": make_huge,
+    "deep": make_deep,
+    "mixed": make_mixed,
+}
+
+
+def generate_tree(root, profile, scale=1.0, seed=1):
+    """Создает синтетическое дерево игры выбранного профиля и возвращает его размер и число файлов."""
+    shutil.rmtree(root, ignore_errors=True)
+    os.makedirs(root)
+    rng = random.Random(seed)
+    PROFILES[profile](root, scale, rng, os.urandom(MB))
+    total_size = 0
+    total_files = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            total_size += os.path.getsize(os.path.join(dirpath, name))
+            total_files += 1
+    return total_size, total_files
+
+
+class RssSampler:
+    """Фоновый замер пикового RSS процесса во время одного запуска."""
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = 0
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = self._process.memory_info().rss
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def _sample(self):
+        self.peak = max(self.peak, self._process.memory_info().rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+
+def run_mode(src, dst, mode, options=None, trace_alloc=False):
+    """Копирует src в dst в выбранном режиме и возвращает измерения одного запуска."""
+    shutil.rmtree(dst, ignore_errors=True)
+    # Без манифеста хешей на источнике, чтобы запуски не влияли друг на друга
+    kwargs = {"sidecar": False}
+    kwargs.update(MODES[mode])
+    kwargs.update(options or {})
+    engine = CopyEngine(src, dst, **kwargs)
+    gc_before = [stats["collections"] for stats in gc.get_stats()]
+    if trace_alloc:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with RssSampler() as rss:
+            engine.run()
+        elapsed = time.perf_counter() - start
+        alloc_peak = tracemalloc.get_traced_memory()[1] if trace_alloc else None
+    finally:
+        if trace_alloc:
+            tracemalloc.stop()
+    gc_after = [stats["collections"] for stats in gc.get_stats()]
+    if engine.error is not None:
+        raise RuntimeError(f"{mode}: {engine.error}")
+    report = engine.integrity_report or {}
+    copy_seconds = engine.phase_times.get("copy", elapsed)
+    return {
+        "mode": mode,
+        "bytes": engine.copied_size,
+        "files": engine.copied_files,
+        "seconds": elapsed,
+        "mb_per_s": engine.copied_size / MB / copy_seconds if copy_seconds > 0 else 0.0,
+        "files_per_s": engine.copied_files / copy_seconds if copy_seconds > 0 else 0.0,
+        "peak_rss_mb": rss.peak / MB,
+        "tracemalloc_peak_kb": alloc_peak / 1024 if alloc_peak is not None else None,
+        "gc_collections": [after - before for before, after in zip(gc_before, gc_after)],
+        "phases": dict(engine.phase_times),
+        "verify_failed": len(report.get("failed", [])),
+        "strategies": dict(engine.strategy_counts),
+        "pipeline": engine.pipeline_stats,
+        "source_stats": engine.source_stats,
+        "throttled_intervals": engine.throttled_intervals,
+    }
+
+
+def run_benchmark(work_dir, profiles, modes, scale=1.0, src_root=None, dst_root=None, options=None,
+                  trace_alloc=False):
+    """Прогоняет все режимы на всех профилях и возвращает отчет для JSON."""
+    results = []
+    for profile in profiles:
+        src = os.path.join(src_root or work_dir, f"src-{profile}")
+        dst = os.path.join(dst_root or work_dir, f"dst-{profile}")
+        total_size, total_files = generate_tree(src, profile, scale)
+        for mode in modes:
+            result = run_mode(src, dst, mode, options, trace_alloc)
+            result.update({"profile": profile, "tree_bytes": total_size, "tree_files": total_files})
+            results.append(result)
+            line = (
+                f"{profile:<6} {mode:<11} {result['mb_per_s']:>9.1f} МБ/с {result['files_per_s']:>9.1f} файлов/с "
+                f"{result['peak_rss_mb']:>7.1f} МБ RSS  gc {result['gc_collections']}"
+            )
+            if result["tracemalloc_peak_kb"] is not None:
+                line += f"  tracemalloc {result['tracemalloc_peak_kb']:.0f} КБ"
+            print(line, file=sys.stderr)
+        shutil.rmtree(src, ignore_errors=True)
+        shutil.rmtree(dst, ignore_errors=True)
+    return {
+        "time": time.time(),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "scale": scale,
+        "trace_alloc": trace_alloc,
+        "results": results,
+    }
+
+
+def compare_with_baseline(report, baseline, tolerance=0.1):
+    """Сравнивает скорость с сохраненным отчетом и возвращает список просадок больше tolerance."""
+    previous = {(r["profile"], r["mode"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        old = previous.get((result["profile"], result["mode"]))
+        if not old or not old["mb_per_s"]:
+            continue
+        ratio = result["mb_per_s"] / old["mb_per_s"]
+        result["baseline_mb_per_s"] = old["mb_per_s"]
+        result["baseline_ratio"] = ratio
+        # Память и сборки мусора только для сравнения, просадкой они не считаются
+        for key in ("tracemalloc_peak_kb", "gc_collections"):
+            if old.get(key) is not None:
+                result[f"baseline_{key}"] = old[key]
+        if ratio < 1 - tolerance:
+            regressions.append(result)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк копирования на синтетических деревьях игр")
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=list(PROFILES))
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=list(MODES))
+    parser.add_argument("--scale", type=float, default=1.0, help="множитель размера деревьев")
+    parser.add_argument("--src", help="где создавать исходные деревья (например, на флешке)")
+    parser.add_argument("--dst", help="куда копировать (по умолчанию временная папка)")
+    parser.add_argument("--output", help="сохранить отчет JSON в файл")
+    parser.add_argument("--baseline", help="сравнить с ранее сохраненным отчетом")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="допустимая просадка скорости, доля")
+    parser.add_argument("--trace-alloc", action="store_true", help="измерить пик памяти Python-объектов через tracemalloc")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="egres-bench-")
+    try:
+        report = run_benchmark(
+            work_dir, args.profiles, args.modes, args.scale, args.src, args.dst, trace_alloc=args.trace_alloc
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_with_baseline(report, json.load(f), args.tolerance)
+        report["regressions"] = [(r["profile"], r["mode"]) for r in regressions]
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    for r in regressions:
+        print(
+            f"Просадка: {r['profile']}/{r['mode']} {r['mb_per_s']:.1f} МБ/с "
+            f"против {r['baseline_mb_per_s']:.1f} МБ/с",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Микробенчмарк алгоритмов хеширования и размеров буфера.
+
+Запуск:
+    python bench_hash.py                    # временный файл 256 МБ
+    python bench_hash.py E:\\Games\\big.pak  # реальный файл, например на флешке
+    python bench_hash.py --size 1024 --repeat 5
+
+Для каждой пары (алгоритм, размер буфера) выводит скорость в МБ/с; лучший
+вариант можно указать в settings.json в параметрах hash_algorithm и hash_buffer_kb.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from hashing import HASH_ALGORITHMS, hash_file
+
+
+BUFFER_SIZES_KB = (4, 64, 1024, 4096)
+
+
+def run_benchmark(file_path, repeat=3, algorithms=HASH_ALGORITHMS, buffer_sizes_kb=BUFFER_SIZES_KB):
+    """Хеширует файл каждым алгоритмом с каждым буфером и возвращает лучшие результаты."""
+    size_mb = os.path.getsize(file_path) / (1024 * 1024)
+    results = []
+    for algorithm in algorithms:
+        for buffer_kb in buffer_sizes_kb:
+            buffer = bytearray(buffer_kb * 1024)
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                hash_file(file_path, algorithm, buffer)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results.append({
+                "algorithm": algorithm,
+                "buffer_kb": buffer_kb,
+                "seconds": best,
+                "mb_per_s": size_mb / best if best > 0 else 0.0,
+            })
+    return sorted(results, key=lambda r: r["mb_per_s"], reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение скорости алгоритмов хеширования")
+    parser.add_argument("path", nargs="?", help="файл для хеширования (по умолчанию временный)")
+    parser.add_argument("--size", type=int, default=256, help="размер временного файла, МБ")
+    parser.add_argument("--repeat", type=int, default=3, help="количество повторов, берется лучший")
+    args = parser.parse_args(argv)
+
+    temp_path = None
+    file_path = args.path
+    if file_path is None:
+        fd, temp_path = tempfile.mkstemp(prefix="egres-bench-")
+        with os.fdopen(fd, "wb") as f:
+            for _ in range(args.size):
+                f.write(os.urandom(1024 * 1024))
+        file_path = temp_path
+
+    try:
+        results = run_benchmark(file_path, args.repeat)
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+
+    print(f"{'Алгоритм':<10} {'Буфер, КБ':>10} {'МБ/с':>10}")
+    for r in results:
+        print(f"{r['algorithm']:<10} {r['buffer_kb']:>10} {r['mb_per_s']:>10.1f}")
+    best = results[0]
+    print(f"\nЛучший вариант: hash_algorithm=\"{best['algorithm']}\", hash_buffer_kb={best['buffer_kb']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""Упаковка папки игры в один файл-бандл для быстрого восстановления с флешки.
+
+Бандл — ZIP без сжатия (ZIP_STORED) с центральным каталогом и индексом
+.egres-index.json, где для каждого файла записаны точные размер, mtime и хеш.
+Файлы лежат в бандле в порядке обхода, поэтому при восстановлении флешка
+читается одним последовательным потоком, без открытия тысяч мелких файлов.
+
+С --compress файлы дополнительно сжимаются блоками (zlib или lzma), каждый
+блок независимо, чтобы при восстановлении их можно было распаковывать
+параллельно. Уже сжатые ресурсы (видео, архивы .pak) определяются по первому
+блоку: если он сжимается хуже, чем до --max-ratio, файл хранится как есть.
+
+Упаковать папку usb_path/<игра> в usb_path/<игра>.egres:
+    python bundle.py E:\\Games\\Fortnite --algorithm md5
+    python bundle.py E:\\Games\\Fortnite --compress zlib --level 6
+"""
+import os
+import sys
+import json
+import time
+import lzma
+import zlib
+import zipfile
+import argparse
+from manifest import scan_tree
+from sidecar import SIDECAR_NAME
+from hashing import HASH_ALGORITHMS, new_hash
+
+
+BUNDLE_SUFFIX = ".egres"
+INDEX_NAME = ".egres-index.json"
+INDEX_VERSION = 2
+SUPPORTED_INDEX_VERSIONS = (1, 2)
+
+COMPRESSION_CODECS = ("zlib", "lzma")
+COMPRESSION_CHUNK_SIZE = 4 * 1024 * 1024
+# Файл сжимается, только если первый блок ужался хотя бы до этой доли исходного размера
+COMPRESSION_MAX_RATIO = 0.9
+
+# Буфер чтения бандла: крупные последовательные чтения вместо мелких
+BUNDLE_READ_BUFFER = 4 * 1024 * 1024
+
+
+def bundle_path(folder):
+    """Возвращает путь к бандлу для папки игры."""
+    return os.path.normpath(folder) + BUNDLE_SUFFIX
+
+
+def is_bundle(path):
+    """Проверяет, что путь указывает на файл-бандл."""
+    return path.endswith(BUNDLE_SUFFIX) and os.path.isfile(path)
+
+
+def find_library_source(usb_path, name):
+    """Ищет игру в библиотеке на флешке: сначала бандл, затем обычную папку."""
+    folder = os.path.join(usb_path, name)
+    if is_bundle(bundle_path(folder)):
+        return bundle_path(folder)
+    if os.path.exists(folder):
+        return folder
+    return None
+
+
+def find_library_sources(usb_paths, name):
+    """Ищет игру на всех флешках библиотеки и возвращает найденные копии.
+
+    Если на первой флешке, где нашлась игра, есть бандл, возвращается только он:
+    бандл читается одним потоком с одной флешки. Иначе возвращаются папки игры
+    со всех флешек, чтобы копирование читало их одновременно.
+    """
+    sources = [source for source in (find_library_source(path, name) for path in usb_paths) if source]
+    if sources and is_bundle(sources[0]):
+        return sources[:1]
+    return [source for source in sources if not is_bundle(source)]
+
+
+def compress_chunk(codec, data, level=6):
+    """Сжимает один блок выбранным кодеком."""
+    if codec == "zlib":
+        return zlib.compress(data, level)
+    if codec == "lzma":
+        return lzma.compress(data, preset=level)
+    raise ValueError(f"Неизвестный кодек сжатия: {codec}")
+
+
+def decompress_chunk(codec, data, size):
+    """Распаковывает один блок и проверяет, что получилось ровно size байт.
+
+    zlib и lzma отпускают GIL на время работы, поэтому вызовы из разных потоков
+    выполняются параллельно.
+    """
+    if codec == "zlib":
+        result = zlib.decompress(data)
+    elif codec == "lzma":
+        result = lzma.decompress(data)
+    else:
+        raise ValueError(f"Неизвестный кодек сжатия: {codec}")
+    if len(result) != size:
+        raise ValueError("Размер распакованного блока не совпадает с индексом")
+    return result
+
+
+def pack_folder(folder, output=None, algorithm="md5", compress=None, level=6,
+                max_ratio=COMPRESSION_MAX_RATIO):
+    """Упаковывает папку игры в бандл и возвращает путь к нему.
+
+    Бандл сначала пишется во временный файл и переименовывается только после
+    полной записи, поэтому оборванная упаковка не оставляет битый бандл.
+    Если задан compress, сжимаемые файлы записываются блоками этого кодека,
+    а длины сжатых блоков сохраняются в индексе (раздел "compressed").
+    """
+    if compress is not None and compress not in COMPRESSION_CODECS:
+        raise ValueError(f"Неизвестный кодек сжатия: {compress}")
+    output = output or bundle_path(folder)
+    manifest = scan_tree(folder, exclude=(SIDECAR_NAME,))
+    index = {"version": INDEX_VERSION, "algorithm": algorithm, "files": {}, "dirs": [], "compressed": {}}
+    buffer = bytearray(COMPRESSION_CHUNK_SIZE if compress else 1024 * 1024)
+    view = memoryview(buffer)
+    tmp_output = output + ".tmp"
+
+    with zipfile.ZipFile(tmp_output, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for entry in manifest:
+            name = entry["rel_path"].replace(os.sep, "/")
+            if entry["type"] == "dir":
+                index["dirs"].append(name)
+                continue
+            info = zipfile.ZipInfo(name, date_time=_zip_date_time(entry["mtime"]))
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = entry["size"]
+            digest = new_hash(algorithm)
+            chunks = None
+            with open(entry["path"], "rb", buffering=0) as f_src, zf.open(info, "w", force_zip64=True) as f_dst:
+                while True:
+                    n = f_src.readinto(buffer)
+                    if not n:
+                        break
+                    digest.update(view[:n])
+                    data = view[:n]
+                    if compress and chunks is not False:
+                        packed = compress_chunk(compress, data, level)
+                        if chunks is None:
+                            # Решаем по первому блоку, стоит ли сжимать файл
+                            chunks = [] if len(packed) <= n * max_ratio else False
+                        if chunks is not False:
+                            data = packed
+                            chunks.append([len(packed), n])
+                    f_dst.write(data)
+            index["files"][name] = [entry["size"], entry["mtime"], digest.hexdigest()]
+            if chunks:
+                index["compressed"][name] = {"codec": compress, "chunks": chunks}
+        zf.writestr(INDEX_NAME, json.dumps(index, ensure_ascii=False))
+
+    os.replace(tmp_output, output)
+    return output
+
+
+def _zip_date_time(mtime):
+    """Переводит mtime в формат даты ZIP (он не поддерживает годы раньше 1980)."""
+    return max(time.localtime(mtime)[:6], (1980, 1, 1, 0, 0, 0))
+
+
+def read_bundle_index(path):
+    """Читает индекс бандла и возвращает манифест в формате scan_tree и сам индекс.
+
+    Записи манифеста идут в порядке расположения данных в бандле, поэтому
+    обход манифеста дает последовательное чтение файла.
+    """
+    with zipfile.ZipFile(path) as zf:
+        index = json.loads(zf.read(INDEX_NAME))
+        offsets = {info.filename: info.header_offset for info in zf.infolist()}
+    if index.get("version") not in SUPPORTED_INDEX_VERSIONS:
+        raise ValueError(f"Неподдерживаемая версия бандла: {path}")
+    index.setdefault("compressed", {})
+
+    manifest = []
+    for name in index["dirs"]:
+        manifest.append({
+            "path": path, "rel_path": name.replace("/", os.sep),
+            "size": 0, "mtime": 0, "type": "dir", "member": name,
+        })
+    for name in sorted(index["files"], key=lambda n: offsets[n]):
+        size, mtime, _ = index["files"][name]
+        manifest.append({
+            "path": path, "rel_path": name.replace("/", os.sep),
+            "size": size, "mtime": mtime, "type": "file", "member": name,
+        })
+    return manifest, index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Упаковка папок игр в бандлы для быстрого восстановления")
+    parser.add_argument("folders", nargs="+", help="папки игр (usb_path/<игра>)")
+    parser.add_argument("--algorithm", choices=HASH_ALGORITHMS, default="md5")
+    parser.add_argument("--compress", choices=COMPRESSION_CODECS, help="сжимать файлы блоками этим кодеком")
+    parser.add_argument("--level", type=int, default=6, help="уровень сжатия")
+    parser.add_argument("--max-ratio", type=float, default=COMPRESSION_MAX_RATIO,
+                        help="не сжимать файлы, первый блок которых ужимается хуже этой доли")
+    args = parser.parse_args(argv)
+    for folder in args.folders:
+        output = pack_folder(folder, algorithm=args.algorithm, compress=args.compress,
+                             level=args.level, max_ratio=args.max_ratio)
+        print(f"{folder} -> {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""Восстановление и проверка игр из командной строки, без Qt.
+
+Запуск:
+    python -m cli restore E:\\Games\\Fortnite "C:\\Program Files\\Epic Games\\Fortnite"
+    python -m cli restore E:\\Fortnite F:\\Fortnite "C:\\Program Files\\Epic Games\\Fortnite"
+    python -m cli restore E:\\Fortnite C:\\Games\\Fortnite --mirror D:\\Games\\Fortnite
+    python -m cli restore E:\\Fortnite C:\\Games\\Fortnite --set workers=4 --set durability=\\"file\\"
+    python -m cli verify E:\\Fortnite C:\\Games\\Fortnite
+    python -m cli benchmark --profiles tiny --modes sequential
+
+В restore и verify последний путь — папка назначения, остальные — копии игры
+на флешках. Параметры копирования берутся из раздела "copy" файла настроек
+(--settings, по умолчанию settings.json в текущей папке, если он есть),
+--set ключ=значение переопределяет отдельные параметры; значение читается
+как JSON, а если не читается — как строка.
+
+Коды завершения: 0 — успешно, 1 — есть файлы с ошибками проверки,
+2 — ошибка копирования, 130 — прервано (Ctrl+C).
+"""
+import os
+import sys
+import json
+import time
+import inspect
+import argparse
+import threading
+from engine import CopyEngine, format_time
+from planner import THROUGHPUT_LOG
+from metrics import METRICS_REPORT
+from profiling import start_profiler
+
+
+EXIT_OK = 0
+EXIT_INTEGRITY = 1
+EXIT_ERROR = 2
+EXIT_CANCELLED = 130
+
+# Как часто печатать прогресс, когда вывод идет не в терминал, с
+LOG_PROGRESS_INTERVAL = 5.0
+
+# Параметры CopyEngine, которые можно задать в разделе "copy" и через --set
+COPY_OPTIONS = set(inspect.signature(CopyEngine).parameters) - {"src", "dst", "metrics", "callback"}
+
+
+def load_copy_options(settings_path, overrides=()):
+    """Читает параметры копирования из файла настроек и применяет переопределения ключ=значение."""
+    options = {}
+    if settings_path and os.path.exists(settings_path):
+        with open(settings_path, "r", encoding="utf-8") as f:
+            options.update(json.load(f).get("copy", {}))
+    for item in overrides:
+        key, sep, value = item.partition("=")
+        if not sep or not key:
+            raise ValueError(f"Ожидается ключ=значение: {item}")
+        try:
+            options[key] = json.loads(value)
+        except ValueError:
+            options[key] = value
+    unknown = sorted(set(options) - COPY_OPTIONS)
+    if unknown:
+        raise ValueError(f"Неизвестные параметры копирования: {', '.join(unknown)}")
+    return options
+
+
+def engine_options(args):
+    """Параметры CopyEngine для команды: файлы журналов приложения, поверх них — настройки и --set."""
+    options = {"throughput_log": THROUGHPUT_LOG, "metrics_report": METRICS_REPORT}
+    options.update(load_copy_options(args.settings, args.set))
+    return options
+
+
+class ProgressPrinter:
+    """Печатает события CopyEngine в stderr: одной обновляемой строкой в терминале, иначе редкими строками."""
+
+    def __init__(self, stream=sys.stderr, quiet=False):
+        self.stream = stream
+        self.quiet = quiet
+        self.interactive = stream.isatty()
+        self._last_line = 0.0
+        self._dirty = False
+
+    def __call__(self, event, data):
+        if event == "progress":
+            self.show_progress(data)
+        elif event == "integrity_progress":
+            self.show_line(f"Проверка целостности: {data}%")
+        elif event == "integrity_finished":
+            self.end_line()
+            failed = len(data["failed"])
+            self.write(f"Проверено файлов: {data['checked']}, с ошибками: {failed}")
+            for item in data["failed"]:
+                self.write(f"  {item['path']}: {item['error']}")
+        elif event == "cancelled":
+            self.end_line()
+            self.write("Копирование отменено")
+        elif event == "error":
+            self.end_line()
+            self.write(data)
+
+    def show_progress(self, stats):
+        remaining = stats["remaining_seconds"]
+        remaining_time_str = format_time(remaining) if remaining is not None else "--:--:--"
+        self.show_line(
+            f"{stats['progress']:3d}%  {stats['speed']:.1f} МБ/с  "
+            f"файлов {stats['done_files']}/{stats['total_files']}  осталось {remaining_time_str}"
+        )
+
+    def show_line(self, text):
+        if self.quiet:
+            return
+        if self.interactive:
+            self.stream.write("\r" + text.ljust(72))
+            self.stream.flush()
+            self._dirty = True
+            return
+        now = time.monotonic()
+        if now - self._last_line >= LOG_PROGRESS_INTERVAL:
+            self._last_line = now
+            self.write(text)
+
+    def end_line(self):
+        if self._dirty:
+            self.stream.write("\n")
+            self._dirty = False
+
+    def write(self, text):
+        self.stream.write(text + "\n")
+        self.stream.flush()
+
+
+def run_engine(engine, printer):
+    """Выполняет копирование, печатая события; Ctrl+C отменяет его и дожидается сохранения журнала."""
+    events = engine.iter_events()
+    try:
+        for event, data in events:
+            printer(event, data)
+    except KeyboardInterrupt:
+        # Закрытие итератора отменяет копирование и ждет сохранения журнала
+        events.close()
+        printer.end_line()
+        printer.write("Копирование отменено")
+        return EXIT_CANCELLED
+    printer.end_line()
+    printer.write(engine.metrics.summary())
+    if engine.error is not None:
+        return EXIT_ERROR
+    if not engine.running:
+        return EXIT_CANCELLED
+    if engine.integrity_report and engine.integrity_report["failed"]:
+        return EXIT_INTEGRITY
+    return EXIT_OK
+
+
+def split_paths(paths, mirrors=()):
+    """Делит пути командной строки на копии игры (все, кроме последнего) и папки назначения."""
+    if len(paths) < 2:
+        raise ValueError("Нужны хотя бы исходная папка и папка назначения")
+    sources = paths[:-1]
+    destinations = [paths[-1]] + list(mirrors)
+    return (sources[0] if len(sources) == 1 else sources,
+            destinations[0] if len(destinations) == 1 else destinations)
+
+
+def profile_engine(engine, profile_dir):
+    """Профилирует копирование и проверку, если задан --profile; результаты пишутся при выходе."""
+    profiler = start_profiler(profile_dir)
+    if profiler:
+        engine.run = profiler.wrap("engine_run", engine.run)
+        engine.verify = profiler.wrap("engine_verify", engine.verify)
+
+
+def cmd_restore(args):
+    src, dst = split_paths(args.paths, args.mirror)
+    engine = CopyEngine(src, dst, **engine_options(args))
+    profile_engine(engine, args.profile)
+    return run_engine(engine, ProgressPrinter(quiet=args.quiet))
+
+
+def cmd_verify(args):
+    src, dst = split_paths(args.paths, args.mirror)
+    options = engine_options(args)
+    printer = ProgressPrinter(quiet=args.quiet)
+    engine = CopyEngine(src, dst, callback=printer, **options)
+    profile_engine(engine, args.profile)
+    return run_verify(engine, printer)
+
+
+def run_verify(engine, printer):
+    """Выполняет проверку в фоновом потоке; Ctrl+C отменяет ее, не дожидаясь оставшихся файлов."""
+    result = {}
+    done = threading.Event()
+
+    def verify():
+        try:
+            result["report"] = engine.verify()
+        except Exception as e:
+            result["error"] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=verify, name="verify", daemon=True).start()
+    try:
+        # Ожидание с таймаутом, чтобы Ctrl+C доходил до главного потока и в Windows
+        while not done.wait(0.1):
+            pass
+    except KeyboardInterrupt:
+        engine.cancel()
+        done.wait()
+        printer.end_line()
+        printer.write("Проверка отменена")
+        return EXIT_CANCELLED
+    if "error" in result:
+        raise result["error"]
+    printer.write(engine.metrics.summary())
+    return EXIT_INTEGRITY if result["report"]["failed"] else EXIT_OK
+
+
+def cmd_benchmark(args):
+    import bench_copy
+
+    return bench_copy.main(args.bench_args)
+
+
+def add_copy_arguments(parser):
+    parser.add_argument("paths", nargs="+", help="копии игры на флешках и последней — папка назначения")
+    parser.add_argument("--settings", default="settings.json", help="файл настроек с разделом \"copy\"")
+    parser.add_argument("--set", action="append", default=[], metavar="КЛЮЧ=ЗНАЧЕНИЕ",
+                        help="переопределить параметр копирования")
+    parser.add_argument("--mirror", action="append", default=[], metavar="ПАПКА",
+                        help="дополнительная папка назначения (restore пишет ее за то же чтение)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="не печатать прогресс")
+    parser.add_argument("--profile", metavar="ПАПКА", help="профилировать cProfile и tracemalloc и сохранить результаты в папку")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Восстановление игр с флешек без интерфейса")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    restore = commands.add_parser("restore", help="скопировать игру и проверить целостность")
+    add_copy_arguments(restore)
+    restore.set_defaults(handler=cmd_restore)
+
+    verify = commands.add_parser("verify", help="только проверить уже скопированную игру")
+    add_copy_arguments(verify)
+    verify.set_defaults(handler=cmd_verify)
+
+    benchmark = commands.add_parser("benchmark", help="бенчмарк копирования (параметры как у bench_copy.py)")
+    benchmark.set_defaults(handler=cmd_benchmark)
+
+    # Параметры бенчмарка разбирает сам bench_copy.main
+    args, rest = parser.parse_known_args(argv)
+    if args.command != "benchmark" and rest:
+        parser.error(f"неизвестные аргументы: {' '.join(rest)}")
+    args.bench_args = rest
+    try:
+        return args.handler(args)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1078 @@
+"""Движок копирования и проверки целостности без зависимости от Qt.
+
+CopyEngine можно использовать из интерфейса (через copy_thread.CopyThread),
+из командной строки (cli.py) и из скриптов. О ходе работы он сообщает
+событиями: через функцию callback(event, data) или итератором iter_events().
+
+События:
+    progress            словарь счетчиков ProgressAggregator (progress, speed,
+                        remaining_seconds, done_files, total_files, ...)
+    integrity_progress  процент проверенных файлов
+    integrity_finished  отчет проверки {"checked", "passed", "failed"}
+    finished            копирование и проверка завершены
+    cancelled           копирование отменено
+    error               текст ошибки; копирование прервано
+"""
+import os
+import time
+import queue
+import errno
+import zipfile
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from manifest import scan_tree, manifest_totals
+from fast_copy import (
+    CHUNK_SIZE, BufferPool, copy_fd, preallocate, make_writer, FanOutWriter,
+    fsync_path, fsync_directory, sync_filesystem,
+)
+from journal import CopyJournal, verify_resume_point
+from pipeline import PipelinedCopier
+from progress import ProgressAggregator
+from sidecar import SIDECAR_NAME, SidecarManifest
+from bundle import BUNDLE_READ_BUFFER, is_bundle, read_bundle_index, decompress_chunk
+from hashing import new_hash, update_from_file, hash_file
+from throttle import make_throttle, lower_priority
+from sources import SourceSelector
+from planner import ORDERINGS, plan_order, device_class, best_ordering, record_throughput
+from metrics import RestoreMetrics, write_json_report, write_prometheus_textfile
+
+
+# Разрешение времени изменения в FAT32 — 2 секунды
+MTIME_TOLERANCE = 2.0
+
+# Когда сбрасывать скопированные данные на диск: никогда, после каждого файла
+# или один раз в конце копирования
+DURABILITY_POLICIES = ("none", "file", "job")
+
+PART_SUFFIX = ".egres-part"
+
+
+def part_path(dst):
+    """Возвращает путь временного файла, в который пишется dst до переименования."""
+    directory, name = os.path.split(dst)
+    return os.path.join(directory, f".{name}{PART_SUFFIX}")
+
+
+def format_time(seconds):
+    """Форматирует время в вид (дни, часы, минуты, секунды)"""
+    if seconds < 0:
+        return "00:00:00"
+
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+
+    if days > 0:
+        return f"{days}д {hours:02d}:{minutes:02d}:{seconds:02d}"
+    elif hours > 0:
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    else:
+        return f"{minutes:02d}:{seconds:02d}"
+
+
+class ByteBudget:
+    """Ограничивает суммарный объем буферов, одновременно занятых рабочими потоками.
+
+    Поток резервирует размер буфера до того, как взять его из BufferPool,
+    и возвращает после файла, поэтому при limit меньше workers * CHUNK_SIZE
+    буферное копирование идет не больше чем в limit // CHUNK_SIZE потоков.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, size):
+        """Резервирует size байт, ожидая, пока бюджет освободится."""
+        size = min(size, self.limit)
+        with self._cond:
+            while self.in_flight + size > self.limit:
+                self._cond.wait()
+            self.in_flight += size
+        return size
+
+    def release(self, size):
+        """Возвращает ранее зарезервированные байты в бюджет."""
+        with self._cond:
+            self.in_flight -= size
+            self._cond.notify_all()
+
+
+class CopyEngine:
+    """Копирование файлов и проверка целостности.
+
+    run() выполняет всю работу в вызывающем потоке; pause(), resume() и
+    cancel() можно вызывать из других потоков.
+    """
+
+    def __init__(self, src, dst, workers=1, max_buffered_mb=64, copy_strategy="auto",
+                 incremental=False, incremental_hash=False, journal=True, journal_checkpoint_mb=64,
+                 hash_while_copying=True, hash_algorithm="md5", hash_buffer_kb=1024, verify_workers=4,
+                 sidecar=True, progress_rate_hz=10, pipeline=False, pipeline_depth=4,
+                 pipeline_buffer_kb=1024, preallocate=True, sparse=False,
+                 decompress_workers=None, bandwidth_limit_mb=0, adaptive_throttle=False,
+                 low_io_priority=False, low_cpu_priority=False, atomic_writes=True,
+                 durability="job", ordering="auto", throughput_log=None,
+                 metrics_report=None, metrics_textfile=None, metrics=None, callback=None):
+        self.callback = callback
+        self._events = None
+        # src — папка игры на одной флешке или список ее копий на нескольких флешках
+        self.sources = [src] if isinstance(src, str) else list(src)
+        self.src = self.sources[0]
+        # dst — папка назначения или список папок, в которые игра пишется за одно чтение
+        self.destinations = [dst] if isinstance(dst, str) else list(dst)
+        self.dst = self.destinations[0]
+        self.workers = max(1, int(workers))
+        if len(self.sources) > 1 and not is_bundle(self.src):
+            # Чтобы флешки читались одновременно, нужно хотя бы по потоку на каждую
+            self.workers = max(self.workers, len(self.sources))
+        self.budget = ByteBudget(max(1, int(max_buffered_mb)) * 1024 * 1024) if self.workers > 1 else None
+        self.copy_strategy = copy_strategy
+        self.incremental = incremental
+        self.incremental_hash = incremental_hash
+        self.use_journal = journal
+        self.checkpoint_bytes = max(1, int(journal_checkpoint_mb)) * 1024 * 1024
+        self.journal = None
+        self.hash_while_copying = hash_while_copying
+        self.source_digests = {}
+        new_hash(hash_algorithm)  # Проверяем название алгоритма сразу, а не в середине копирования
+        self.hash_algorithm = hash_algorithm
+        self.hash_buffer_size = max(4, int(hash_buffer_kb)) * 1024
+        # Буферы копирования и хеширования общие для всех файлов, потоков и этапов
+        self.buffers = BufferPool()
+        self.verify_workers = max(1, int(verify_workers))
+        self.integrity_report = None
+        self.use_sidecar = sidecar
+        self.sidecar = None
+        self.pipeline = pipeline
+        self.pipeline_depth = pipeline_depth
+        self.pipeline_buffer_size = max(4, int(pipeline_buffer_kb)) * 1024
+        self.pipeline_stats = None
+        self.preallocate = preallocate
+        self.sparse = sparse
+        self.sparse_bytes = 0
+        self.bundle = None
+        self.decompress_workers = max(1, int(decompress_workers or os.cpu_count() or 1))
+        if durability not in DURABILITY_POLICIES:
+            raise ValueError(f"Неизвестный режим сброса на диск: {durability}")
+        self.atomic_writes = atomic_writes
+        self.durability = durability
+        # Для durability="job": готовые временные файлы и записи журнала, ждущие общего сброса на диск
+        self.unsynced = []
+        self.pending_done = []
+        if ordering != "auto" and ordering not in ORDERINGS:
+            raise ValueError(f"Неизвестный порядок копирования: {ordering}")
+        self.ordering = ordering
+        self.throughput_log = throughput_log
+        self.devices = None
+        self.throughput = None
+        self.selector = None
+        self.source_stats = None
+        self.fanout = None
+        if len(self.destinations) > 1:
+            self.fanout = FanOutWriter(
+                make_writer(sparse, self.on_hole),
+                make_writer(sparse),
+                workers=(len(self.destinations) - 1) * self.workers,
+            )
+        self.throttle = make_throttle(bandwidth_limit_mb, adaptive_throttle)
+        self.low_io_priority = low_io_priority
+        self.low_cpu_priority = low_cpu_priority
+        self.progress = ProgressAggregator(self.progress_sample, self.emit_progress, progress_rate_hz)
+        self.skipped_files = 0
+        self.skipped_size = 0
+        self.strategy_counts = Counter()
+        self._lock = threading.Lock()
+        self.total_size = 0
+        self.copied_size = 0
+        self.copied_files = 0
+        self.total_files = 0
+        self.running = True
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+        self.start_time = 0
+        # metrics передает интерфейс, чтобы в тот же отчет попали ожидание и закрытие Epic Games
+        self.metrics = metrics or RestoreMetrics()
+        self.metrics_report = metrics_report
+        self.metrics_textfile = metrics_textfile
+        self.error = None
+        self.stage = "scan"
+        self.manifest = []
+
+    def run(self):
+        """Основной метод, выполняющий копирование и проверку целостности."""
+        try:
+            self.start_time = time.time()
+            # Рабочие потоки создаются из этого потока и наследуют его приоритет
+            lower_priority(self.low_io_priority, self.low_cpu_priority)
+
+            self.sources = [src for src in self.sources if os.path.exists(src)]
+            if not self.sources:
+                raise FileNotFoundError(f"Исходный путь не существует: {self.src}")
+            self.src = self.sources[0]
+
+            with self.metrics.phase("scan"):
+                self.scan_source()
+                self.setup_sources()
+            self.metrics.add("scan", self.total_size, self.total_files)
+
+            for root in self.destinations:
+                # У относительного пути вида "Fortnite" родительской папки нет, она текущая
+                parent = os.path.dirname(root)
+                if parent and not os.path.exists(parent):
+                    os.makedirs(parent, exist_ok=True)
+
+            if self.use_journal:
+                self.journal = CopyJournal(self.src, self.dst)
+            self.remove_stale_parts()
+
+            self.progress.start()
+            self.stage = "copy"
+            with self.metrics.phase("copy"):
+                try:
+                    self.copy_files()
+                finally:
+                    self.progress.stop()
+                    if self.fanout:
+                        self.fanout.close()
+                    if self.selector:
+                        self.source_stats = self.selector.stats()
+                self.sync_destination()
+            self.metrics.add("copy", self.copied_size, self.copied_files)
+            if self.running:
+                self.record_throughput(self.phase_times["copy"])
+                self.stage = "verify"
+                with self.metrics.phase("verify"):
+                    self.check_integrity()
+            self.save_sidecar()
+            if not self.running:
+                # Отменено: журнал остается, чтобы следующий запуск продолжил с того же места
+                if self.journal:
+                    self.journal.close()
+                self.export_metrics("cancelled")
+                self.emit("cancelled")
+                return
+            if self.journal:
+                # Копирование завершено целиком, журнал больше не нужен
+                self.journal.remove()
+            self.export_metrics("finished")
+            self.emit("finished")
+        except Exception as e:
+            self.error = e
+            try:
+                # Уже скопированные файлы ставятся на место, чтобы следующий запуск их пропустил
+                self.sync_destination()
+            except OSError:
+                pass
+            if self.journal:
+                self.journal.close()
+            self.save_sidecar()
+            self.metrics.error(self.stage, str(e))
+            self.export_metrics("failed")
+            self.emit("error", f"Произошла ошибка при копировании: {str(e)}")
+        finally:
+            self.buffers.clear()
+
+    @property
+    def phase_times(self):
+        """Длительность этапов последнего запуска, с: scan, copy и verify."""
+        return self.metrics.phase_seconds()
+
+    @property
+    def throttled_intervals(self):
+        """Сколько раз адаптивное ограничение снижало скорость (None без adaptive_throttle)."""
+        return getattr(self.throttle, "throttled_intervals", None)
+
+    def export_metrics(self, status):
+        """Пишет метрики восстановления отчетом JSON и файлом для Prometheus, если они заданы."""
+        if not self.metrics_report and not self.metrics_textfile:
+            return
+        report = self.metrics.report(
+            status,
+            game=os.path.basename(os.path.normpath(self.dst)),
+            sources=self.sources,
+            destinations=self.destinations,
+            skipped_files=self.skipped_files,
+            skipped_bytes=self.skipped_size,
+            strategies=dict(self.strategy_counts),
+            pipeline=self.pipeline_stats,
+            source_stats=self.source_stats,
+            throttled_intervals=self.throttled_intervals,
+        )
+        if self.metrics_report:
+            write_json_report(self.metrics_report, report)
+        if self.metrics_textfile:
+            write_prometheus_textfile(self.metrics_textfile, report)
+
+    def emit(self, event, data=None):
+        """Сообщает о событии через callback и в очередь iter_events()."""
+        if self.callback:
+            self.callback(event, data)
+        if self._events is not None:
+            self._events.put((event, data))
+
+    def iter_events(self):
+        """Запускает run() в фоновом потоке и отдает события (event, data) по мере работы.
+
+        Итерация заканчивается, когда run() завершился; последним приходит
+        событие finished, cancelled или error. Если итерацию бросить раньше
+        (например, по Ctrl+C), копирование отменяется и итератор дожидается,
+        пока журнал и недописанные файлы будут сохранены.
+        """
+        self._events = queue.Queue()
+        worker = threading.Thread(target=self._run_for_events, name="copy-engine", daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = self._events.get()
+                if item is None:
+                    break
+                yield item
+        finally:
+            if worker.is_alive():
+                self.cancel()
+            worker.join()
+
+    def _run_for_events(self):
+        try:
+            self.run()
+        finally:
+            self._events.put(None)
+
+    def verify(self):
+        """Только проверяет целостность уже скопированной игры, ничего не копируя, и возвращает отчет.
+
+        Метрики пишутся так же, как в конце run(); ошибка проверки учитывается
+        в них и передается вызывающему.
+        """
+        try:
+            self.sources = [src for src in self.sources if os.path.exists(src)]
+            if not self.sources:
+                raise FileNotFoundError(f"Исходный путь не существует: {self.src}")
+            self.src = self.sources[0]
+            with self.metrics.phase("scan"):
+                self.scan_source()
+            self.metrics.add("scan", self.total_size, self.total_files)
+            self.stage = "verify"
+            with self.metrics.phase("verify"):
+                report = self.check_integrity()
+            self.save_sidecar()
+        except Exception as e:
+            self.error = e
+            self.metrics.error(self.stage, str(e))
+            self.export_metrics("failed")
+            raise
+        self.export_metrics("finished" if self.running else "cancelled")
+        return report
+
+    def pause(self):
+        """Приостанавливает копирование или проверку; потоки ждут, не нагружая процессор."""
+        self._resume_event.clear()
+
+    def resume(self):
+        """Продолжает приостановленное копирование."""
+        self._resume_event.set()
+
+    def cancel(self):
+        """Отменяет копирование; текущий блок дописывается, дальше работа прекращается."""
+        self.running = False
+        self._resume_event.set()
+
+    def is_cancelled(self):
+        """Проверяет, отменено ли копирование."""
+        return not self.running
+
+    def is_paused(self):
+        """Проверяет, приостановлено ли копирование."""
+        return not self._resume_event.is_set()
+
+    def should_continue(self):
+        """Вызывается перед каждым блоком: ждет снятия паузы и сообщает, не отменено ли копирование."""
+        self._resume_event.wait()
+        return self.running
+
+    def scan_source(self):
+        """Сканирует источник один раз и заполняет манифест и итоговые счетчики."""
+        if is_bundle(self.src):
+            self.scan_bundle()
+            return
+        self.manifest = scan_tree(self.src, exclude=(SIDECAR_NAME,))
+        self.total_size, self.total_files = manifest_totals(self.manifest)
+        if self.use_sidecar and os.path.isdir(self.src):
+            self.sidecar = SidecarManifest(self.src, self.hash_algorithm)
+            for entry in self.manifest:
+                if entry["type"] == "file":
+                    digest = self.sidecar.digest_for(entry)
+                    if digest is not None:
+                        self.source_digests[entry["rel_path"]] = digest
+
+    def scan_bundle(self):
+        """Берет манифест и хеши файлов из индекса бандла, не читая сами данные."""
+        self.manifest, self.bundle = read_bundle_index(self.src)
+        self.total_size, self.total_files = manifest_totals(self.manifest)
+        # Хеши в индексе посчитаны при упаковке, проверка должна использовать тот же алгоритм
+        self.hash_algorithm = self.bundle["algorithm"]
+        for entry in self.manifest:
+            if entry["type"] == "file":
+                self.source_digests[entry["rel_path"]] = self.bundle["files"][entry["member"]][2]
+
+    def setup_sources(self):
+        """Готовит чтение с нескольких флешек: с каждой берутся только файлы, совпадающие с основной.
+
+        Манифест строится по первой флешке, остальные сканируются один раз,
+        и файл читается с них, только если у него тот же размер и mtime.
+        Из бандла игра всегда восстанавливается с одной флешки.
+        """
+        if len(self.sources) < 2 or self.bundle or not os.path.isdir(self.src):
+            return
+        self.selector = SourceSelector()
+        self.selector.add(self.src)
+        expected = {e["rel_path"]: e for e in self.manifest if e["type"] == "file"}
+        for root in self.sources[1:]:
+            if not os.path.isdir(root):
+                continue
+            try:
+                mirror = scan_tree(root, exclude=(SIDECAR_NAME,))
+            except OSError:
+                continue
+            files = set()
+            for entry in mirror:
+                original = expected.get(entry["rel_path"])
+                if (entry["type"] == "file" and original is not None and entry["size"] == original["size"]
+                        and abs(entry["mtime"] - original["mtime"]) <= MTIME_TOLERANCE):
+                    files.add(entry["rel_path"])
+            self.selector.add(root, files)
+
+    def save_sidecar(self):
+        """Сохраняет на флешку новые хеши исходных файлов."""
+        if self.sidecar:
+            self.sidecar.prune(self.manifest)
+            self.sidecar.save()
+
+    def remove_stale_parts(self):
+        """Удаляет временные файлы .egres-part, оставшиеся от прерванных копирований.
+
+        Сохраняются только те, с контрольной точки которых журнал продолжит
+        копирование; остальные (от сбоя до первой контрольной точки, от ошибки
+        или от файлов, которых больше нет в игре) продолжить нельзя.
+        """
+        keep = set()
+        if self.journal:
+            keep = {
+                os.path.normcase(part_path(os.path.join(self.dst, rel_path)))
+                for rel_path in self.journal.partial
+            }
+        for root in self.destinations:
+            for directory, _, names in os.walk(root):
+                for name in names:
+                    if not (name.startswith(".") and name.endswith(PART_SUFFIX)):
+                        continue
+                    path = os.path.join(directory, name)
+                    if os.path.normcase(path) in keep:
+                        continue
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def dst_path(self, entry, root=None):
+        """Возвращает путь назначения для записи манифеста (по умолчанию в основной папке назначения)."""
+        root = root or self.dst
+        if not entry["rel_path"]:
+            return root
+        return os.path.join(root, entry["rel_path"])
+
+    def dst_paths(self, entry):
+        """Возвращает пути файла во всех папках назначения."""
+        return [self.dst_path(entry, root) for root in self.destinations]
+
+    def copy_files(self):
+        """Копирует файлы из манифеста с заменой."""
+        if os.path.isdir(self.src) or self.bundle:
+            for root in self.destinations:
+                os.makedirs(root, exist_ok=True)
+
+        files = []
+        for entry in self.manifest:
+            if entry["type"] == "dir":
+                for path in self.dst_paths(entry):
+                    os.makedirs(path, exist_ok=True)
+            else:
+                files.append(entry)
+
+        if self.bundle:
+            # Данные в бандле и так лежат в порядке чтения, переставлять нечего
+            self.copy_files_from_bundle(files)
+            return
+
+        files = plan_order(files, self.resolve_ordering())
+        if self.pipeline and self.selector is None:
+            self.copy_files_pipelined(files)
+        elif self.workers == 1:
+            for entry in files:
+                if not self.running:
+                    return
+                self.copy_file(entry)
+        else:
+            self.copy_files_parallel(files)
+
+    def device_key(self):
+        """Возвращает класс устройств источника и назначения, например "vfat->ext4/hdd"."""
+        if self.devices is None:
+            self.devices = f"{device_class(self.src)}->{device_class(os.path.dirname(self.dst) or '.')}"
+        return self.devices
+
+    def resolve_ordering(self):
+        """Выбирает порядок копирования; в режиме auto — самый быстрый по журналу скорости."""
+        if self.ordering == "auto":
+            if self.throughput_log:
+                self.ordering = best_ordering(self.throughput_log, self.device_key())
+            else:
+                self.ordering = "manifest"
+        return self.ordering
+
+    def record_throughput(self, seconds):
+        """Сохраняет скорость завершенного копирования в CopyEngine.throughput и в журнал скорости."""
+        if self.copied_size == 0 or seconds <= 0:
+            return
+        self.throughput = {
+            "time": time.time(),
+            "devices": self.device_key(),
+            "ordering": "bundle" if self.bundle else self.ordering,
+            "workers": self.workers,
+            "pipeline": self.pipeline,
+            "sources": len(self.sources),
+            "bytes": self.copied_size,
+            "files": self.copied_files,
+            "seconds": seconds,
+            "mb_per_s": self.copied_size / (1024 * 1024) / seconds,
+            "files_per_s": self.copied_files / seconds,
+        }
+        if self.throughput_log:
+            record_throughput(self.throughput_log, self.throughput)
+
+    def copy_files_parallel(self, files):
+        """Копирует файлы пулом потоков, ограничивая объем данных в буферах."""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [
+                pool.submit(self.copy_file, entry) for entry in files
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            except Exception:
+                # Останавливаем остальные потоки, чтобы не копировать впустую
+                self.running = False
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def copy_files_from_bundle(self, files):
+        """Распаковывает файлы из бандла одним последовательным проходом по флешке.
+
+        Сжатые файлы читаются блоками по порядку, а распаковываются параллельно
+        в пуле из decompress_workers потоков.
+        """
+        write = self.make_write()
+        buffer = self.buffers.acquire(CHUNK_SIZE)
+        view = memoryview(buffer)
+        compressed = self.bundle["compressed"]
+        pool = ThreadPoolExecutor(max_workers=self.decompress_workers) if compressed else None
+        try:
+            with open(self.src, 'rb', buffering=BUNDLE_READ_BUFFER) as f_bundle, zipfile.ZipFile(f_bundle) as zf:
+                for entry in files:
+                    job = self.prepare_file(entry)
+                    if job is None:
+                        continue
+                    packed = compressed.get(entry["member"])
+                    try:
+                        with zf.open(entry["member"]) as f_src, open(job["dst"], 'wb', buffering=0) as f_dst:
+                            on_chunk = self.setup_destination(job, f_dst.fileno())
+                            if packed:
+                                self.unpack_chunks(f_src, f_dst.fileno(), packed, pool, write, job["digest"], on_chunk)
+                                strategy = f"bundle-{packed['codec']}"
+                            else:
+                                strategy = "bundle"
+                                while self.should_continue():
+                                    n = f_src.readinto(view)
+                                    if not n:
+                                        break
+                                    chunk = view if n == len(view) else view[:n]
+                                    write(f_dst.fileno(), chunk)
+                                    if job["digest"] is not None:
+                                        job["digest"].update(chunk)
+                                    on_chunk(n)
+                    except BaseException:
+                        self.abandon_file(job)
+                        raise
+                    self.finish_file(job, strategy)
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+            view.release()
+            self.buffers.release(buffer)
+
+    def unpack_chunks(self, f_src, dst_fd, packed, pool, write, digest, on_chunk):
+        """Читает сжатые блоки файла по порядку, распаковывает их в пуле и пишет в том же порядке."""
+        pending = deque()
+        window = self.decompress_workers * 2
+        for packed_size, size in packed["chunks"]:
+            if not self.should_continue():
+                break
+            data = f_src.read(packed_size)
+            pending.append(pool.submit(decompress_chunk, packed["codec"], data, size))
+            if len(pending) >= window:
+                self.write_unpacked(pending.popleft().result(), dst_fd, write, digest, on_chunk)
+        while pending and self.should_continue():
+            self.write_unpacked(pending.popleft().result(), dst_fd, write, digest, on_chunk)
+        for future in pending:
+            future.cancel()
+
+    def write_unpacked(self, chunk, dst_fd, write, digest, on_chunk):
+        """Записывает распакованный блок и учитывает его в хеше и прогрессе."""
+        write(dst_fd, chunk)
+        if digest is not None:
+            digest.update(chunk)
+        on_chunk(len(chunk))
+
+    def copy_files_pipelined(self, files):
+        """Копирует файлы конвейером: чтение следующих блоков идет во время записи предыдущих."""
+        copier = PipelinedCopier(
+            self.pipeline_depth,
+            self.pipeline_buffer_size,
+            self.should_continue,
+            self.make_write(),
+            self.buffers,
+        )
+        self.pipeline_stats = copier.stats
+        copier.run(files, self.prepare_file, self.setup_destination, self.finish_file, self.abandon_file)
+
+    def copy_file(self, entry):
+        """Копирует один файл лучшей доступной стратегией и запоминает, какой именно."""
+        job = self.prepare_file(entry)
+        if job is None:
+            return
+        try:
+            if self.selector:
+                strategy = self.copy_striped(job)
+            else:
+                strategy = self.copy_job(job)
+        except BaseException:
+            self.abandon_file(job)
+            raise
+        self.finish_file(job, strategy)
+
+    def copy_striped(self, job):
+        """Копирует файл с флешки, выбранной по измеренной скорости.
+
+        Если флешку отключили посреди файла, копирование продолжается с уже
+        записанного места с другой флешки, где есть этот файл.
+        """
+        entry = job["entry"]
+        tried = []
+        while True:
+            source = self.selector.pick(entry, tried)
+            if source is None:
+                raise FileNotFoundError(f"Файл недоступен ни на одной флешке: {entry['rel_path']}")
+            job["src"] = self.selector.path_for(source, entry)
+            start_offset = job["offset"]
+            start = time.perf_counter()
+            try:
+                strategy = self.copy_job(job)
+            except OSError as e:
+                self.selector.finish(source, entry["size"], 0, 0)
+                if self.selector.is_lost(source, e):
+                    self.selector.fail(source)
+                    self.metrics.error("copy", f"флешка отключена: {source['root']}", job["src"])
+                elif not (e.errno == errno.ENOENT and not os.path.exists(job["src"])):
+                    raise
+                tried.append(source)
+                if self.fanout:
+                    # Дополнительные копии открываются заново с начала, поэтому и основную пишем с начала
+                    self.close_mirrors(job)
+                    job["offset"] = 0
+                    if job["digest"] is not None:
+                        job["digest"] = new_hash(self.hash_algorithm)
+                else:
+                    job["offset"] = job.get("written", job["offset"])
+                continue
+            self.selector.finish(source, entry["size"], job["written"] - start_offset, time.perf_counter() - start)
+            return strategy
+
+    def copy_job(self, job):
+        """Копирует данные файла по заданию и возвращает использованную стратегию."""
+        strategy = self.copy_strategy
+        if self.selector and strategy == "mmap":
+            # Отключение флешки под mmap убивает процесс сигналом SIGBUS, а не ошибкой
+            # чтения, и файл уже нельзя дописать с другой флешки
+            strategy = "buffered"
+        offset = job["offset"]
+        with open(job["src"], 'rb', buffering=0) as f_src, open(job["dst"], 'r+b' if offset else 'wb', buffering=0) as f_dst:
+            if offset:
+                f_dst.truncate(offset)
+            return copy_fd(
+                f_src.fileno(),
+                f_dst.fileno(),
+                strategy,
+                on_chunk=self.setup_destination(job, f_dst.fileno()),
+                should_continue=self.should_continue,
+                budget=self.budget,
+                offset=offset,
+                digest=job["digest"],
+                sparse=self.sparse,
+                on_hole=self.on_hole,
+                write=self.fanout,
+                buffers=self.buffers,
+            )
+
+    def make_write(self):
+        """Возвращает функцию записи блока: с размножением по папкам назначения или обычную."""
+        if self.fanout:
+            return self.fanout
+        return make_writer(self.sparse, self.on_hole)
+
+    def prepare_file(self, entry):
+        """Решает, нужно ли копировать файл, и готовит задание на копирование.
+
+        Возвращает None, если файл пропущен (уже скопирован по журналу или не
+        изменился), иначе словарь с путями, смещением для возобновления и
+        объектом хеша источника.
+        """
+        if not self.running:
+            return None
+        src = entry["path"]
+        final = self.dst_path(entry)
+        dst = part_path(final) if self.atomic_writes else final
+        skip = False
+        # Файл пропускается, только если он уже есть во всех папках назначения
+        if self.journal and self.journal.is_done(entry):
+            skip = all(self.stat_matches(entry, path) for path in self.dst_paths(entry))
+        if not skip and self.incremental:
+            skip = all(self.is_up_to_date(entry, path) for path in self.dst_paths(entry))
+        if skip:
+            with self._lock:
+                self.skipped_files += 1
+                self.skipped_size += entry["size"]
+            return None
+
+        offset = 0
+        # Из бандла файл читается потоком, продолжить его с середины нельзя;
+        # при записи в несколько папок журнал ведется только для основной
+        if self.journal and not self.bundle and not self.fanout:
+            offset = self.journal.resume_offset(entry)
+            if offset:
+                offset = verify_resume_point(src, dst, offset)
+
+        with self._lock:
+            self.copied_files += 1
+            self.skipped_size += offset
+
+        digest = None
+        # Хеш из манифеста на флешке уже известен — можно копировать средствами ядра
+        if self.hash_while_copying and entry["rel_path"] not in self.source_digests:
+            digest = new_hash(self.hash_algorithm)
+            if offset:
+                # Уже записанная часть не проходила через цикл — дохешируем ее из источника
+                with open(src, 'rb', buffering=0) as f_src, self.buffers.borrow(self.hash_buffer_size) as buffer:
+                    update_from_file(f_src, digest, buffer, offset)
+
+        job = {
+            "entry": entry, "src": src, "dst": dst, "final": final, "offset": offset, "digest": digest,
+            "started": time.perf_counter(),
+        }
+        if self.fanout:
+            job["mirrors"] = [
+                (part_path(path) if self.atomic_writes else path, path)
+                for path in self.dst_paths(entry)[1:]
+            ]
+        return job
+
+    def setup_destination(self, job, dst_fd):
+        """Готовит открытый файл назначения и возвращает обработчик записанных блоков."""
+        if self.preallocate or self.sparse:
+            preallocate(dst_fd, job["entry"]["size"], self.sparse)
+        if job.get("mirrors"):
+            self.open_mirrors(job, dst_fd)
+        job["written"] = job["offset"]
+        checkpointing = self.journal and job["entry"]["size"] > self.checkpoint_bytes
+        next_checkpoint = [job["offset"] + self.checkpoint_bytes]
+
+        def on_chunk(size):
+            self.on_chunk_copied(size)
+            job["written"] += size
+            if checkpointing and job["written"] >= next_checkpoint[0]:
+                # Сначала данные на диск, потом запись в журнал
+                os.fsync(dst_fd)
+                self.journal.checkpoint(job["entry"], job["written"])
+                next_checkpoint[0] = job["written"] + self.checkpoint_bytes
+
+        return on_chunk
+
+    def finish_file(self, job, strategy):
+        """Завершает копирование файла: сохраняет хеш, mtime и отметку в журнале."""
+        if not self.running:
+            self.abandon_file(job)
+            return
+        entry = job["entry"]
+        digest = job["digest"]
+        if digest is not None:
+            self.source_digests[entry["rel_path"]] = digest.hexdigest()
+            if self.sidecar:
+                self.sidecar.update(entry, self.source_digests[entry["rel_path"]])
+        self.commit_file(entry, job["dst"], job["final"])
+        if job.get("mirrors"):
+            self.close_mirrors(job)
+            for tmp, final in job["mirrors"]:
+                self.commit_file(entry, tmp, final)
+        if self.journal:
+            if self.durability == "job":
+                # Отметка в журнале — только после сброса данных на диск в sync_destination
+                with self._lock:
+                    self.pending_done.append(entry)
+            else:
+                self.journal.mark_done(entry)
+        self.metrics.observe("copy", time.perf_counter() - job["started"])
+        if strategy:
+            with self._lock:
+                self.strategy_counts[strategy] += 1
+
+    def commit_file(self, entry, tmp, final):
+        """Выставляет файлу mtime источника, сбрасывает его на диск по режиму durability и ставит на место.
+
+        При durability="job" файл остается под временным именем до общего
+        сброса на диск в sync_destination.
+        """
+        # Сохраняем время изменения, чтобы повторный запуск мог пропустить файл
+        os.utime(tmp, (entry["mtime"], entry["mtime"]))
+        if self.durability == "job":
+            with self._lock:
+                self.unsynced.append((tmp, final))
+            return
+        if self.durability == "file":
+            fsync_path(tmp)
+        if tmp != final:
+            # Старая версия файла заменяется новой только целиком
+            os.replace(tmp, final)
+            if self.durability == "file":
+                fsync_directory(os.path.dirname(final) or ".")
+
+    def open_mirrors(self, job, dst_fd):
+        """Открывает файлы в дополнительных папках назначения и подключает их к записи основного."""
+        job["mirror_files"] = []
+        for tmp, _ in job["mirrors"]:
+            f = open(tmp, 'wb', buffering=0)
+            job["mirror_files"].append(f)
+            if self.preallocate or self.sparse:
+                preallocate(f.fileno(), job["entry"]["size"], self.sparse)
+        job["mirror_fd"] = dst_fd
+        job["mirror_fds"] = [f.fileno() for f in job["mirror_files"]]
+        self.fanout.attach(dst_fd, job["mirror_fds"])
+
+    def close_mirrors(self, job):
+        """Отключает и закрывает файлы в дополнительных папках назначения."""
+        if "mirror_fd" in job:
+            self.fanout.detach(job.pop("mirror_fd"), job.pop("mirror_fds"))
+        for f in job.pop("mirror_files", ()):
+            f.close()
+
+    def on_hole(self, size):
+        """Учитывает нулевой блок, оставленный в файле назначения дырой."""
+        with self._lock:
+            self.sparse_bytes += size
+
+    def abandon_file(self, job):
+        """Обрабатывает файл, копирование которого прервано отменой или ошибкой.
+
+        Крупный файл при включенном журнале остается на диске, а в журнал
+        записывается контрольная точка, чтобы следующий запуск продолжил с нее.
+        Остальные недописанные файлы удаляются, чтобы не оставлять битых данных.
+        При atomic_writes все это касается только временного файла, а прежняя
+        версия файла назначения остается нетронутой.
+        """
+        entry = job["entry"]
+        written = job.get("written", 0)
+        if job.get("mirrors"):
+            self.close_mirrors(job)
+            for tmp, _ in job["mirrors"]:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+        if self.journal and not self.bundle and not self.fanout and entry["size"] > self.checkpoint_bytes and written > 0:
+            try:
+                fsync_path(job["dst"])
+                self.journal.checkpoint(entry, written)
+                return
+            except OSError:
+                pass
+        try:
+            os.remove(job["dst"])
+        except OSError:
+            pass
+
+    def sync_destination(self):
+        """Один раз сбрасывает на диск все скопированные файлы (режим durability="job").
+
+        Если ОС не умеет сбросить файловую систему целиком, файлы сбрасываются
+        по одному, но все равно одним проходом в конце, а не во время копирования.
+        Только после этого файлы переименовываются на место и отмечаются в
+        журнале, поэтому после сбоя питания под именем файла игры не окажется
+        недописанных данных, а журнал не пропустит такой файл.
+        """
+        if self.durability != "job" or not self.unsynced:
+            return
+        synced = [sync_filesystem(root if os.path.isdir(root) else os.path.dirname(root)) for root in self.destinations]
+        if not all(synced):
+            for tmp, _ in self.unsynced:
+                fsync_path(tmp)
+        for tmp, final in self.unsynced:
+            if tmp != final:
+                os.replace(tmp, final)
+        if self.journal:
+            for entry in self.pending_done:
+                self.journal.mark_done(entry)
+        self.unsynced = []
+        self.pending_done = []
+
+    def stat_matches(self, entry, dst):
+        """Проверяет, что у файла назначения тот же размер и время изменения, что у источника."""
+        try:
+            st = os.stat(dst)
+        except OSError:
+            return False
+        return st.st_size == entry["size"] and abs(st.st_mtime - entry["mtime"]) <= MTIME_TOLERANCE
+
+    def is_up_to_date(self, entry, dst):
+        """Проверяет, что файл назначения совпадает с источником и его можно не копировать."""
+        if not self.incremental_hash:
+            return self.stat_matches(entry, dst)
+        try:
+            st = os.stat(dst)
+        except OSError:
+            return False
+        if st.st_size != entry["size"]:
+            return False
+        src_digest = self.source_digests.get(entry["rel_path"]) or self.calculate_hash(entry["path"])
+        if src_digest != self.calculate_hash(dst):
+            return False
+        if abs(st.st_mtime - entry["mtime"]) > MTIME_TOLERANCE:
+            # Файл совпал по содержимому — выравниваем mtime для следующих запусков
+            os.utime(dst, (entry["mtime"], entry["mtime"]))
+        return True
+
+    def on_chunk_copied(self, size):
+        """Учитывает скопированный блок и при заданном ограничении скорости ждет.
+
+        Прогресс отправляет ProgressAggregator.
+        """
+        with self._lock:
+            self.copied_size += size
+        if self.throttle:
+            self.throttle.consume(size, self.is_cancelled)
+
+    def progress_sample(self):
+        """Возвращает текущие счетчики копирования для ProgressAggregator."""
+        with self._lock:
+            return {
+                "copied_size": self.copied_size,
+                "done_size": self.copied_size + self.skipped_size,
+                "total_size": self.total_size,
+                "done_files": self.copied_files + self.skipped_files,
+                "total_files": self.total_files,
+                "skipped_files": self.skipped_files,
+                "skipped_size": self.skipped_size,
+            }
+
+    def emit_progress(self, stats):
+        """Отправляет прогресс, рассчитанный ProgressAggregator."""
+        self.emit("progress", stats)
+
+    def check_integrity(self):
+        """Проверяет целостность файлов по манифесту пулом потоков и формирует общий отчет.
+
+        hashlib отпускает GIL при хешировании больших блоков, поэтому потоки
+        проверяют файлы действительно параллельно. Результат отправляется одним
+        событием integrity_finished, окна с ошибками показывает интерфейс.
+        """
+        files = [entry for entry in self.manifest if entry["type"] == "file"]
+        report = {"checked": 0, "passed": 0, "failed": []}
+        last_progress = -1
+        with ThreadPoolExecutor(max_workers=self.verify_workers) as pool:
+            futures = [pool.submit(self.verify_entry, entry) for entry in files]
+            for future in as_completed(futures):
+                if not self.running:
+                    pool.shutdown(cancel_futures=True)
+                    break
+                src, error = future.result()
+                report["checked"] += 1
+                if error is None:
+                    report["passed"] += 1
+                else:
+                    report["failed"].append({"path": src, "error": error})
+                    self.metrics.error("verify", error, src)
+                progress = int((report["checked"] / len(files)) * 100)
+                if progress != last_progress:
+                    last_progress = progress
+                    self.emit("integrity_progress", progress)
+
+        self.integrity_report = report
+        self.emit("integrity_finished", report)
+        return report
+
+    def verify_entry(self, entry):
+        """Проверяет один файл манифеста и возвращает путь для отчета и описание ошибки (None, если файл цел)."""
+        start = time.perf_counter()
+        result = self.verify_entry_files(entry)
+        self.metrics.add("verify", entry["size"] if result[1] is None else 0, 1)
+        self.metrics.observe("verify", time.perf_counter() - start)
+        return result
+
+    def verify_entry_files(self, entry):
+        """Сверяет файл манифеста со всеми его копиями в папках назначения."""
+        src = entry["path"]
+        # У файла из бандла путь источника — сам бандл, поэтому в отчете указывается файл назначения
+        shown = self.dst_path(entry) if self.bundle else src
+        src_digest = self.source_digests.get(entry["rel_path"])
+        try:
+            if not self.should_continue():
+                return shown, "проверка отменена"
+            if src_digest is None and self.sidecar:
+                # Хешируем источник один раз и запоминаем результат на флешке
+                src_digest = self.calculate_hash(src)
+                if not self.running:
+                    return shown, "проверка отменена"
+                self.sidecar.update(entry, src_digest)
+            if src_digest is None and self.fanout:
+                # Источник хешируется один раз для всех папок назначения
+                src_digest = self.calculate_hash(src)
+            for dst in self.dst_paths(entry):
+                if not self.verify_file_integrity(src, dst, entry["size"], src_digest):
+                    return shown, f"содержимое не совпадает: {dst}" if self.fanout else "содержимое не совпадает"
+            return shown, None
+        except OSError as e:
+            return shown, str(e)
+
+    def verify_file_integrity(self, src, dst, src_size=None, src_digest=None):
+        """Проверяет целостность файла с помощью хеша.
+
+        Если хеш источника уже посчитан при копировании, перечитывается только файл назначения.
+        """
+        if not os.path.exists(dst):
+            return False
+
+        if src_size is None:
+            src_size = os.path.getsize(src)
+        if src_size != os.path.getsize(dst):
+            return False
+
+        if src_digest is None:
+            src_digest = self.calculate_hash(src)
+        return src_digest == self.calculate_hash(dst)
+
+    def calculate_hash(self, file_path):
+        """Вычисляет хеш файла выбранным алгоритмом."""
+        with self.buffers.borrow(self.hash_buffer_size) as buffer:
+            return hash_file(file_path, self.hash_algorithm, buffer, self.should_continue)
@@ -0,0 +1,393 @@
+import io
+import os
+import sys
+import mmap
+import errno
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+
+CHUNK_SIZE = 1024 * 1024
+
+# Гранулярность поиска нулевых блоков при разреженной записи
+SPARSE_BLOCK_SIZE = 64 * 1024
+_ZERO_BLOCK = bytes(SPARSE_BLOCK_SIZE)
+
+# В NTFS сдвиг позиции за нулевой блок не оставляет дыры, пока файл не помечен
+# разреженным (FSCTL_SET_SPARSE), и нули все равно записываются на диск, поэтому
+# разреженная запись, как и posix_fallocate, работает только в POSIX-системах
+SPARSE_SUPPORTED = sys.platform != "win32"
+
+STRATEGIES = ("copy_file_range", "sendfile", "mmap", "buffered")
+
+# Стратегии, в которых данные проходят через процесс: их можно хешировать на лету
+# и в них можно пропускать нулевые блоки
+USERSPACE_STRATEGIES = ("mmap", "buffered")
+
+# Стратегия, которой копирование через процесс идет, если mmap не выбран явно.
+# Извлечение флешки посреди файла под mmap убивает процесс (SIGBUS, в Windows —
+# ошибка страницы), и журнал не успевает сохранить контрольную точку; при
+# чтении через буфер это обычная ошибка OSError
+DEFAULT_USERSPACE_STRATEGY = "buffered"
+
+# Ошибки, при которых стратегия не поддерживается для этой пары файлов
+# (другая ФС, старое ядро, неподходящий тип файла) и нужно перейти к следующей
+FALLBACK_ERRNOS = {
+    errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP,
+    getattr(errno, "ENOTSUP", errno.EOPNOTSUPP), errno.ENODEV, errno.EBADF,
+}
+
+
+def available_strategies():
+    """Возвращает стратегии копирования, доступные на этой платформе, от лучшей к худшей.
+
+    mmap в этот список не входит и используется, только если задан явно.
+    """
+    strategies = []
+    if hasattr(os, "copy_file_range"):
+        strategies.append("copy_file_range")
+    # Только Linux умеет sendfile в обычный файл, а не в сокет
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        strategies.append("sendfile")
+    strategies.append(DEFAULT_USERSPACE_STRATEGY)
+    return strategies
+
+
+def copy_fd(src_fd, dst_fd, strategy="auto", chunk_size=CHUNK_SIZE,
+            on_chunk=None, should_continue=None, budget=None, offset=0, digest=None,
+            sparse=False, on_hole=None, write=None, buffers=None):
+    """Копирует содержимое src_fd в dst_fd и возвращает имя использованной стратегии.
+
+    При strategy="auto" перебирает доступные стратегии по порядку: если ядро или
+    файловая система не поддерживает текущую, копирование продолжается следующей
+    с того же смещения. on_chunk(n) вызывается после каждого записанного блока,
+    should_continue() позволяет прервать копирование между блоками.
+    offset задает начало копирования при возобновлении прерванного файла.
+    Если передан digest (объект hashlib), каждый записанный блок добавляется
+    в него; копирование внутри ядра при этом недоступно, поэтому используется
+    buffered (или mmap, если он задан явно). То же относится к sparse=True:
+    полностью нулевые блоки не записываются, а пропускаются через lseek,
+    и их размер передается в on_hole(n). Размер файла назначения в этом
+    режиме нужно заранее выставить через preallocate(..., sparse=True).
+    write(fd, data) заменяет обычную запись блока (например, FanOutWriter)
+    и тоже ограничивает выбор стратегиями из USERSPACE_STRATEGIES.
+    buffers (BufferPool) дает буфер для стратегии buffered, общий с другими
+    файлами; без него буфер выделяется один раз на файл.
+    Для пустого файла возвращает None.
+    """
+    if os.fstat(src_fd).st_size == 0:
+        return None
+
+    sparse = sparse and SPARSE_SUPPORTED
+    if strategy == "auto":
+        candidates = available_strategies()
+    else:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Неизвестная стратегия копирования: {strategy}")
+        candidates = [strategy]
+    if digest is not None or sparse or write is not None:
+        candidates = [name for name in candidates if name in USERSPACE_STRATEGIES] or [DEFAULT_USERSPACE_STRATEGY]
+    if write is None:
+        write = make_writer(sparse, on_hole)
+
+    copied = [offset]
+
+    def report(n):
+        copied[0] += n
+        if on_chunk:
+            on_chunk(n)
+
+    keep_going = should_continue or (lambda: True)
+    for i, name in enumerate(candidates):
+        try:
+            _COPIERS[name](src_fd, dst_fd, copied[0], chunk_size, report, keep_going, budget, digest, write, buffers)
+            return name
+        except OSError as e:
+            if i == len(candidates) - 1 or e.errno not in FALLBACK_ERRNOS:
+                raise
+        except ValueError:
+            # mmap отказывается отображать некоторые специальные файлы
+            if i == len(candidates) - 1:
+                raise
+    return candidates[-1]
+
+
+def _copy_file_range(src_fd, dst_fd, offset, chunk_size, report, keep_going, budget, digest, write, buffers):
+    """Копирование внутри ядра через copy_file_range (с reflink, если ФС умеет)."""
+    while keep_going():
+        n = os.copy_file_range(src_fd, dst_fd, chunk_size, offset, offset)
+        if n == 0:
+            break
+        offset += n
+        report(n)
+
+
+def _sendfile(src_fd, dst_fd, offset, chunk_size, report, keep_going, budget, digest, write, buffers):
+    """Копирование внутри ядра через sendfile."""
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    while keep_going():
+        n = os.sendfile(dst_fd, src_fd, offset, chunk_size)
+        if n == 0:
+            break
+        offset += n
+        report(n)
+
+
+def _mmap(src_fd, dst_fd, offset, chunk_size, report, keep_going, budget, digest, write, buffers):
+    """Запись из отображенного в память файла срезами memoryview без копий в bytes."""
+    size = os.fstat(src_fd).st_size
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    with mmap.mmap(src_fd, 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            while offset < size and keep_going():
+                end = min(offset + chunk_size, size)
+                write(dst_fd, view[offset:end])
+                if digest is not None:
+                    digest.update(view[offset:end])
+                report(end - offset)
+                offset = end
+
+
+def _buffered(src_fd, dst_fd, offset, chunk_size, report, keep_going, budget, digest, write, buffers):
+    """Обычное копирование через буфер в памяти процесса.
+
+    Данные читаются через readinto в один и тот же буфер, поэтому на блок
+    не создается новый объект bytes. budget резервируется на все время, пока
+    буфер занят файлом, и тем ограничивает число буферов, одновременно
+    выданных рабочим потокам: лишние потоки ждут, пока другие закончат файл.
+    """
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    pool = buffers or BufferPool()
+    reserved = budget.acquire(chunk_size) if budget else 0
+    try:
+        with pool.borrow(chunk_size) as buffer, memoryview(buffer) as view, \
+                io.FileIO(src_fd, "rb", closefd=False) as f_src:
+            while keep_going():
+                n = f_src.readinto(view)
+                if not n:
+                    break
+                chunk = view if n == len(view) else view[:n]
+                write(dst_fd, chunk)
+                if digest is not None:
+                    digest.update(chunk)
+                report(n)
+    finally:
+        if reserved:
+            budget.release(reserved)
+
+
+class BufferPool:
+    """Запас переиспользуемых буферов bytearray, общий для всех файлов и потоков.
+
+    Буфер берется на время копирования или хеширования файла и возвращается
+    в пул, поэтому копирование и следующая за ним проверка целостности
+    работают на одних и тех же буферах, а их число не превышает числа
+    одновременно обрабатываемых файлов. Буферы разных размеров хранятся
+    отдельно.
+    """
+
+    def __init__(self):
+        self._free = {}
+        self._lock = threading.Lock()
+        self.allocated = 0
+
+    def acquire(self, size):
+        """Возвращает свободный буфер размера size, выделяя новый, только если свободных нет."""
+        with self._lock:
+            free = self._free.get(size)
+            if free:
+                return free.pop()
+            self.allocated += 1
+        return bytearray(size)
+
+    def release(self, buffer):
+        """Возвращает буфер в пул."""
+        with self._lock:
+            self._free.setdefault(len(buffer), []).append(buffer)
+
+    def clear(self):
+        """Отпускает свободные буферы, когда работа закончена."""
+        with self._lock:
+            self._free.clear()
+
+    @contextmanager
+    def borrow(self, size):
+        """Берет буфер на время блока with."""
+        buffer = self.acquire(size)
+        try:
+            yield buffer
+        finally:
+            self.release(buffer)
+
+
+def preallocate(fd, size, sparse=False):
+    """Готовит файл назначения к записи size байт.
+
+    Обычно место выделяется сразу целиком через posix_fallocate, чтобы большой
+    файл не фрагментировался при росте блоками. Для разреженной записи файлу
+    только задается итоговый размер, а незаписанные области остаются дырами.
+    Там, где posix_fallocate нет (Windows) или ФС его не поддерживает,
+    ничего не делает; разреженные файлы на Windows тоже не создаются
+    (см. SPARSE_SUPPORTED).
+    """
+    if size <= 0:
+        return
+    if sparse and SPARSE_SUPPORTED:
+        os.ftruncate(fd, size)
+        return
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            pass
+
+
+def make_writer(sparse=False, on_hole=None):
+    """Возвращает функцию записи буфера: обычную или пропускающую нулевые блоки.
+
+    На Windows всегда обычную: дыры там без FSCTL_SET_SPARSE не образуются.
+    """
+    if not sparse or not SPARSE_SUPPORTED:
+        return write_all
+
+    def write_sparse(fd, data):
+        view = memoryview(data)
+        start = 0
+        pending = 0  # начало еще не записанного ненулевого участка
+        while start < len(view):
+            end = min(start + SPARSE_BLOCK_SIZE, len(view))
+            if is_zero_block(view[start:end]):
+                if pending < start:
+                    write_all(fd, view[pending:start])
+                os.lseek(fd, end - start, os.SEEK_CUR)
+                if on_hole:
+                    on_hole(end - start)
+                pending = end
+            start = end
+        if pending < len(view):
+            write_all(fd, view[pending:])
+
+    return write_sparse
+
+
+def is_zero_block(view):
+    """Проверяет, что блок целиком состоит из нулей."""
+    # Быстрый отказ по краям блока, чтобы не сравнивать обычные данные целиком
+    if view[0] or view[-1]:
+        return False
+    # startswith сравнивает с буфером напрямую, без копии блока в bytes
+    return _ZERO_BLOCK.startswith(view)
+
+
+def write_all(fd, data):
+    """Записывает буфер целиком, повторяя os.write при частичной записи."""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+class FanOutWriter:
+    """Функция записи, которая дублирует каждый блок в дополнительные файлы назначения.
+
+    Дополнительные дескрипторы привязываются к основному через attach().
+    Блок пишется в основной файл в вызывающем потоке, а в дополнительные —
+    одновременно в пуле потоков (os.write отпускает GIL); вызов возвращается,
+    когда блок записан везде, поэтому буфер можно сразу использовать снова.
+    """
+
+    def __init__(self, write=write_all, extra_write=None, workers=1):
+        self.write = write
+        self.extra_write = extra_write or write
+        self._targets = {}
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="fanout")
+
+    def attach(self, fd, extra_fds):
+        """Связывает основной дескриптор с дескрипторами дополнительных файлов."""
+        self._targets[fd] = extra_fds
+
+    def detach(self, fd, extra_fds):
+        """Отвязывает дополнительные файлы от основного дескриптора.
+
+        Основной файл к этому моменту может быть уже закрыт, а его номер
+        дескриптора — занят новым файлом, поэтому удаляется только своя привязка.
+        """
+        if self._targets.get(fd) is extra_fds:
+            del self._targets[fd]
+
+    def __call__(self, fd, data):
+        extras = self._targets.get(fd)
+        if not extras:
+            self.write(fd, data)
+            return
+        futures = [self._pool.submit(self.extra_write, extra_fd, data) for extra_fd in extras]
+        try:
+            self.write(fd, data)
+        finally:
+            for future in futures:
+                future.result()
+
+    def close(self):
+        """Останавливает пул потоков записи."""
+        self._pool.shutdown()
+
+
+def fsync_path(path):
+    """Сбрасывает на диск данные уже закрытого файла."""
+    # В Windows fsync требует дескриптор, открытый на запись
+    fd = os.open(path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_directory(path):
+    """Сбрасывает на диск запись каталога, чтобы переименование пережило сбой питания.
+
+    В Windows каталог открыть нельзя, и там ничего не делает.
+    """
+    if sys.platform == "win32":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def sync_filesystem(path):
+    """Одним вызовом сбрасывает на диск все данные файловой системы, где лежит path.
+
+    В Linux используется syncfs только для этой ФС, на других POSIX-системах —
+    общий os.sync. Возвращает False, если так сделать нельзя (Windows), и тогда
+    файлы нужно сбрасывать по одному.
+    """
+    if sys.platform.startswith("linux"):
+        try:
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                if libc.syncfs(fd) == 0:
+                    return True
+            finally:
+                os.close(fd)
+        except (OSError, AttributeError):
+            pass
+    if hasattr(os, "sync"):
+        os.sync()
+        return True
+    return False
+
+
+_COPIERS = {
+    "copy_file_range": _copy_file_range,
+    "sendfile": _sendfile,
+    "mmap": _mmap,
+    "buffered": _buffered,
+}
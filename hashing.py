@@ -0,0 +1,45 @@
+import hashlib
+
+
+HASH_ALGORITHMS = ("blake2b", "sha256", "md5")
+
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def new_hash(algorithm="md5"):
+    """Создает объект hashlib для выбранного алгоритма."""
+    if algorithm not in HASH_ALGORITHMS:
+        raise ValueError(f"Неизвестный алгоритм хеширования: {algorithm}")
+    return hashlib.new(algorithm)
+
+
+def update_from_file(f, digest, buffer=None, length=None, should_continue=None):
+    """Добавляет в digest содержимое открытого файла с текущей позиции.
+
+    Данные читаются через readinto в переданный заранее выделенный bytearray,
+    поэтому на каждый блок не создается новый объект bytes. Если задан length,
+    читается не больше length байт. should_continue() проверяется перед каждым
+    блоком и позволяет прервать хеширование большого файла.
+    """
+    if buffer is None:
+        buffer = bytearray(HASH_BUFFER_SIZE)
+    with memoryview(buffer) as view:
+        while length is None or length > 0:
+            if should_continue is not None and not should_continue():
+                break
+            # Срез создается только для последнего, неполного блока
+            chunk = view if length is None or length >= len(view) else view[:length]
+            n = f.readinto(chunk)
+            if not n:
+                break
+            digest.update(chunk if n == len(chunk) else chunk[:n])
+            if length is not None:
+                length -= n
+
+
+def hash_file(file_path, algorithm="md5", buffer=None, should_continue=None):
+    """Вычисляет хеш файла выбранным алгоритмом и возвращает его в виде hex-строки."""
+    digest = new_hash(algorithm)
+    with open(file_path, "rb", buffering=0) as f:
+        update_from_file(f, digest, buffer, should_continue=should_continue)
+    return digest.hexdigest()
@@ -0,0 +1,135 @@
+import os
+import json
+import threading
+
+
+JOURNAL_SUFFIX = ".egres-journal"
+
+# Сколько байт перед сохраненным смещением сверяется с источником при возобновлении
+RESUME_VERIFY_BYTES = 4 * 1024 * 1024
+
+
+def journal_path(dst):
+    """Возвращает путь к журналу, который лежит рядом с каталогом назначения."""
+    dst = os.path.normpath(dst)
+    return os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}{JOURNAL_SUFFIX}")
+
+
+class CopyJournal:
+    """Журнал копирования, позволяющий продолжить прерванное копирование.
+
+    Журнал — файл JSON Lines: первая строка описывает пару src/dst, дальше идут
+    записи о завершенных файлах ("done") и контрольные точки крупных файлов
+    ("partial") со смещением, до которого данные уже сброшены на диск.
+    Записи только дописываются, поэтому оборванная при сбое последняя строка
+    просто игнорируется при чтении.
+    """
+
+    def __init__(self, src, dst):
+        self.src = os.path.abspath(src)
+        self.dst = os.path.abspath(dst)
+        self.path = journal_path(dst)
+        self.done = {}
+        self.partial = {}
+        self.resumed = self._load()
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a" if self.resumed else "w", encoding="utf-8")
+        if not self.resumed:
+            self._append({"src": self.src, "dst": self.dst})
+
+    def _load(self):
+        """Читает существующий журнал, если он относится к той же паре src/dst."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return False
+        if not lines:
+            return False
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            return False
+        if header.get("src") != self.src or header.get("dst") != self.dst:
+            return False
+
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            rel_path = record["path"]
+            if record.get("done"):
+                self.done[rel_path] = (record["size"], record["mtime"])
+                self.partial.pop(rel_path, None)
+            else:
+                self.partial[rel_path] = (record["size"], record["mtime"], record["offset"])
+        return True
+
+    def _append(self, record, sync=False):
+        """Дописывает запись в журнал."""
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def is_done(self, entry):
+        """Проверяет, что файл уже был полностью скопирован в прошлый раз."""
+        return self.done.get(entry["rel_path"]) == (entry["size"], entry["mtime"])
+
+    def resume_offset(self, entry):
+        """Возвращает смещение, с которого можно продолжить копирование файла."""
+        record = self.partial.get(entry["rel_path"])
+        if record is None or record[:2] != (entry["size"], entry["mtime"]):
+            return 0
+        return record[2]
+
+    def mark_done(self, entry):
+        """Отмечает файл как полностью скопированный."""
+        with self._lock:
+            self._append({
+                "path": entry["rel_path"], "size": entry["size"],
+                "mtime": entry["mtime"], "done": True,
+            })
+
+    def checkpoint(self, entry, offset):
+        """Сохраняет смещение крупного файла; данные до offset уже должны быть на диске."""
+        with self._lock:
+            self._append({
+                "path": entry["rel_path"], "size": entry["size"],
+                "mtime": entry["mtime"], "offset": offset,
+            }, sync=True)
+
+    def close(self):
+        """Закрывает файл журнала."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def remove(self):
+        """Удаляет журнал после успешного завершения копирования."""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def verify_resume_point(src, dst, offset, window=RESUME_VERIFY_BYTES):
+    """Сверяет с источником хвост уже записанной части файла перед возобновлением.
+
+    Возвращает offset, если данные перед ним совпадают, иначе 0 — тогда файл
+    копируется заново.
+    """
+    try:
+        if os.path.getsize(dst) < offset:
+            return 0
+        start = max(0, offset - window)
+        with open(src, "rb") as f_src, open(dst, "rb") as f_dst:
+            f_src.seek(start)
+            f_dst.seek(start)
+            if f_src.read(offset - start) != f_dst.read(offset - start):
+                return 0
+    except OSError:
+        return 0
+    return offset
@@ -1,11 +1,15 @@
 #pyinstaller --onefile --windowed --icon=icon.ico --name="EGReS" main.py
 import sys
+import argparse
 from PyQt5.QtWidgets import QApplication
 from ui import MainWindow
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    parser = argparse.ArgumentParser(description="Epic Games ReStore")
+    parser.add_argument("--profile", metavar="ПАПКА", help="профилировать программу и сохранить результаты в папку")
+    args, qt_args = parser.parse_known_args()
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = MainWindow(profile_dir=args.profile)
     window.show()
     sys.exit(app.exec_())
     
\ No newline at end of file
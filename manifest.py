@@ -0,0 +1,64 @@
+import os
+import stat
+
+
+def scan_tree(root, exclude=()):
+    """Однократно обходит дерево через os.scandir и возвращает манифест.
+
+    Манифест — список словарей с ключами path, rel_path, size, mtime, inode
+    и type ("file" или "dir"). Каталог всегда идет раньше своего содержимого, поэтому
+    при копировании по манифесту родительские папки создаются первыми.
+    Если root — файл, манифест состоит из одной записи с пустым rel_path.
+    Имена из exclude пропускаются в корне дерева (служебные файлы программы).
+    """
+    if not os.path.isdir(root):
+        st = os.stat(root)
+        return [_make_entry(root, "", st, "file")]
+
+    manifest = []
+    stack = [(root, "")]
+    while stack:
+        path, rel_path = stack.pop()
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        subdirs = []
+        for entry in entries:
+            if not rel_path and entry.name in exclude:
+                continue
+            item_rel = os.path.join(rel_path, entry.name) if rel_path else entry.name
+            st = entry.stat()
+            if stat.S_ISDIR(st.st_mode):
+                manifest.append(_make_entry(entry.path, item_rel, st, "dir", entry.inode()))
+                subdirs.append((entry.path, item_rel))
+            else:
+                manifest.append(_make_entry(entry.path, item_rel, st, "file", entry.inode()))
+        # Обратный порядок, чтобы подкаталоги обходились по алфавиту
+        stack.extend(reversed(subdirs))
+    return manifest
+
+
+def _make_entry(path, rel_path, st, entry_type, inode=None):
+    """Формирует запись манифеста из результата stat.
+
+    В Windows stat из scandir не заполняет st_ino, поэтому номер берется из
+    DirEntry.inode(), если он передан.
+    """
+    return {
+        "path": path,
+        "rel_path": rel_path,
+        "size": st.st_size if entry_type == "file" else 0,
+        "mtime": st.st_mtime,
+        "inode": st.st_ino if inode is None else inode,
+        "type": entry_type,
+    }
+
+
+def manifest_totals(manifest):
+    """Возвращает общий размер и количество файлов в манифесте."""
+    total_size = 0
+    total_files = 0
+    for entry in manifest:
+        if entry["type"] == "file":
+            total_size += entry["size"]
+            total_files += 1
+    return total_size, total_files
@@ -0,0 +1,250 @@
+"""Метрики одного восстановления игры: этапы, задержки файлов и ошибки.
+
+Этапы (phase) — от ожидания стабильности загрузки и закрытия Epic Games в
+интерфейсе до сканирования, копирования и проверки в CopyEngine. Для каждого
+этапа считаются время, объем и число файлов, для копирования и проверки —
+гистограмма времени обработки одного файла. В конце восстановления метрики
+пишутся отчетом JSON и файлом для textfile-коллектора Prometheus
+(node_exporter --collector.textfile.directory).
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+
+METRICS_REPORT = "restore_metrics.json"
+
+# Границы корзин гистограммы времени обработки файла, с
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+
+# Сколько ошибок сохраняется в отчете с подробностями; остальные только считаются
+MAX_RECORDED_ERRORS = 100
+
+PHASE_TITLES = {
+    "stability_wait": "ожидание",
+    "launcher_kill": "закрытие Epic",
+    "scan": "сканирование",
+    "copy": "копирование",
+    "verify": "проверка",
+}
+
+
+class LatencyHistogram:
+    """Гистограмма длительностей с фиксированными корзинами, как у Prometheus."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Оценивает квантиль по верхней границе корзины, в которую он попадает."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def cumulative(self):
+        """Возвращает пары (граница, число наблюдений не больше нее), последней идет +Inf."""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {str(bound): total for bound, total in self.cumulative()},
+        }
+
+
+class RestoreMetrics:
+    """Собирает метрики одного восстановления; методы можно вызывать из любых потоков."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.phases = {}
+        self.latency = {}
+        self.errors = []
+        self.error_counts = {}
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def _phase(self, name):
+        return self.phases.setdefault(name, {"seconds": 0.0, "bytes": 0, "files": 0})
+
+    def start_phase(self, name):
+        """Начинает этап, который заканчивается в другом месте кода (например, по таймеру)."""
+        with self._lock:
+            self._phase(name)
+            self._open[name] = time.perf_counter()
+
+    def end_phase(self, name):
+        """Заканчивает этап, начатый start_phase; повторный вызов ничего не делает."""
+        with self._lock:
+            start = self._open.pop(name, None)
+            if start is not None:
+                self._phase(name)["seconds"] += time.perf_counter() - start
+
+    @contextmanager
+    def phase(self, name):
+        """Измеряет время блока как этап name."""
+        self.start_phase(name)
+        try:
+            yield
+        finally:
+            self.end_phase(name)
+
+    def add(self, name, size=0, files=0):
+        """Добавляет к этапу обработанный объем и число файлов."""
+        with self._lock:
+            phase = self._phase(name)
+            phase["bytes"] += size
+            phase["files"] += files
+
+    def observe(self, name, seconds):
+        """Учитывает время обработки одного файла на этапе name."""
+        with self._lock:
+            histogram = self.latency.get(name)
+            if histogram is None:
+                histogram = self.latency[name] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def error(self, name, message, path=None):
+        """Учитывает ошибку на этапе name."""
+        with self._lock:
+            self.error_counts[name] = self.error_counts.get(name, 0) + 1
+            if len(self.errors) < MAX_RECORDED_ERRORS:
+                self.errors.append({"phase": name, "path": path, "error": message})
+
+    def phase_seconds(self):
+        """Возвращает длительность каждого этапа, с."""
+        with self._lock:
+            return {name: phase["seconds"] for name, phase in self.phases.items()}
+
+    def report(self, status, **extra):
+        """Формирует отчет для JSON; незаконченные этапы закрываются."""
+        for name in list(self._open):
+            self.end_phase(name)
+        with self._lock:
+            report = {
+                "started": self.started,
+                "finished": time.time(),
+                "status": status,
+                "phases": {name: dict(phase) for name, phase in self.phases.items()},
+                "latency": {name: histogram.to_dict() for name, histogram in self.latency.items()},
+                "error_counts": dict(self.error_counts),
+                "errors": list(self.errors),
+            }
+        report.update(extra)
+        return report
+
+    def summary(self):
+        """Краткая сводка для строки состояния: время этапов, скорость копирования и число ошибок."""
+        with self._lock:
+            parts = []
+            for name, phase in self.phases.items():
+                text = f"{PHASE_TITLES.get(name, name)} {phase['seconds']:.1f} с"
+                if name == "copy" and phase["seconds"] > 0 and phase["bytes"]:
+                    text += f" ({phase['bytes'] / (1024 * 1024) / phase['seconds']:.1f} МБ/с)"
+                parts.append(text)
+            errors = sum(self.error_counts.values())
+        if errors:
+            parts.append(f"ошибок {errors}")
+        return ", ".join(parts)
+
+
+def write_json_report(path, report):
+    """Записывает отчет JSON; ошибки записи не мешают восстановлению."""
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    except OSError:
+        pass
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_prometheus(report):
+    """Преобразует отчет в текстовый формат Prometheus."""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{_label(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+    phases = report["phases"]
+    metric("egres_phase_seconds", "gauge", "Длительность этапа последнего восстановления, с",
+           [({"phase": name}, phase["seconds"]) for name, phase in phases.items()])
+    metric("egres_phase_bytes", "gauge", "Объем, обработанный на этапе последнего восстановления",
+           [({"phase": name}, phase["bytes"]) for name, phase in phases.items()])
+    metric("egres_phase_files", "gauge", "Число файлов, обработанных на этапе последнего восстановления",
+           [({"phase": name}, phase["files"]) for name, phase in phases.items()])
+
+    samples = []
+    for name, histogram in report["latency"].items():
+        for bound, total in histogram["buckets"].items():
+            samples.append(({"phase": name, "le": bound}, total))
+    if samples:
+        lines.append("# HELP egres_file_latency_seconds Время обработки одного файла, с")
+        lines.append("# TYPE egres_file_latency_seconds histogram")
+        for labels, value in samples:
+            lines.append(f'egres_file_latency_seconds_bucket{{phase="{labels["phase"]}",le="{labels["le"]}"}} {value}')
+        for name, histogram in report["latency"].items():
+            lines.append(f'egres_file_latency_seconds_sum{{phase="{name}"}} {histogram["sum"]}')
+            lines.append(f'egres_file_latency_seconds_count{{phase="{name}"}} {histogram["count"]}')
+
+    metric("egres_errors", "gauge", "Ошибки последнего восстановления по этапам",
+           [({"phase": name}, count) for name, count in report["error_counts"].items()])
+    metric("egres_restore_success", "gauge", "1, если последнее восстановление завершилось без ошибок",
+           [({}, 1 if report["status"] == "finished" and not report["error_counts"] else 0)])
+    metric("egres_restore_timestamp_seconds", "gauge", "Время окончания последнего восстановления",
+           [({}, report["finished"])])
+    metric("egres_restore_info", "gauge", "Игра и итог последнего восстановления",
+           [({"game": report.get("game", ""), "status": report["status"]}, 1)])
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(path, report):
+    """Записывает метрики для textfile-коллектора атомарно, чтобы он не прочитал файл наполовину."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(format_prometheus(report))
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
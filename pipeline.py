@@ -0,0 +1,151 @@
+import time
+import queue
+import threading
+from fast_copy import CHUNK_SIZE, BufferPool, write_all
+
+
+# Как часто заблокированные потоки проверяют, не пора ли остановиться, с
+_POLL_INTERVAL = 0.1
+
+
+class PipelinedCopier:
+    """Конвейерное копирование: чтение и запись идут одновременно в разных потоках.
+
+    Поток чтения заполняет кольцо из depth переиспользуемых буферов и, закончив
+    файл, сразу переходит к следующему, пока предыдущий еще записывается.
+    Вызывающий поток забирает заполненные буферы, пишет их в файлы назначения
+    и возвращает буферы в кольцо. В stats копится время, которое каждая
+    сторона простояла в ожидании другой. Буферы кольца берутся из buffers
+    (BufferPool) и возвращаются в него после run().
+    """
+
+    def __init__(self, depth=4, buffer_size=CHUNK_SIZE, should_continue=None, write=write_all, buffers=None):
+        self.depth = max(2, int(depth))
+        self.buffer_size = max(4096, int(buffer_size))
+        self.should_continue = should_continue or (lambda: True)
+        self.write = write
+        self.stats = {"reader_stall": 0.0, "writer_stall": 0.0, "bytes": 0, "files": 0}
+        self._free = queue.Queue()
+        self._filled = queue.Queue()
+        self._stop = threading.Event()
+        self._buffers = buffers or BufferPool()
+        self._ring = [self._buffers.acquire(self.buffer_size) for _ in range(self.depth)]
+        for buffer in self._ring:
+            self._free.put(buffer)
+
+    def run(self, entries, prepare, setup_destination, finish, abandon=None):
+        """Копирует файлы entries.
+
+        prepare(entry) вызывается в потоке чтения и возвращает задание
+        (словарь с ключами src, dst, offset, digest) или None, если файл
+        копировать не нужно. setup_destination(job, dst_fd) готовит открытый
+        файл назначения и возвращает обработчик записанных блоков,
+        finish(job, "pipelined") вызывается после закрытия файла назначения.
+        Если копирование остановлено посреди файла, он закрывается и
+        вызывается finish(job, None), а если прервано ошибкой — abandon(job).
+        """
+        reader = threading.Thread(target=self._read_all, args=(entries, prepare), name="pipeline-reader", daemon=True)
+        reader.start()
+        try:
+            self._write_all(setup_destination, finish, abandon)
+        finally:
+            self._stop.set()
+            reader.join()
+            for buffer in self._ring:
+                self._buffers.release(buffer)
+            self._ring = []
+
+    def _keep_going(self):
+        return not self._stop.is_set() and self.should_continue()
+
+    def _get(self, q, stall_key):
+        """Забирает элемент из очереди, учитывая время ожидания; None — пора остановиться."""
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    return q.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    if not self._keep_going():
+                        return None
+        finally:
+            self.stats[stall_key] += time.perf_counter() - start
+
+    def _read_all(self, entries, prepare):
+        """Поток чтения: читает файлы по порядку в свободные буферы кольца."""
+        try:
+            for entry in entries:
+                if not self._keep_going():
+                    break
+                job = prepare(entry)
+                if job is None:
+                    continue
+                complete = False
+                with open(job["src"], "rb", buffering=0) as f_src:
+                    f_src.seek(job["offset"])
+                    while self._keep_going():
+                        buffer = self._get(self._free, "reader_stall")
+                        if buffer is None:
+                            return
+                        n = f_src.readinto(buffer)
+                        if not n:
+                            self._free.put(buffer)
+                            complete = True
+                            break
+                        self._filled.put((job, buffer, n))
+                if not complete:
+                    break
+                # Пустой буфер отмечает конец файла
+                self._filled.put((job, None, 0))
+        except Exception as e:
+            self._filled.put((None, e, 0))
+        finally:
+            self._filled.put(None)
+
+    def _write_all(self, setup_destination, finish, abandon=None):
+        """Поток записи: пишет заполненные буферы в файлы назначения."""
+        current_job = None
+        f_dst = None
+        on_chunk = None
+        try:
+            while True:
+                item = self._get(self._filled, "writer_stall")
+                if item is None:
+                    break
+                job, buffer, n = item
+                if job is None:
+                    raise buffer
+                if job is not current_job:
+                    current_job = job
+                    f_dst = open(job["dst"], "r+b" if job["offset"] else "wb", buffering=0)
+                    if job["offset"]:
+                        f_dst.truncate(job["offset"])
+                        f_dst.seek(job["offset"])
+                    on_chunk = setup_destination(job, f_dst.fileno())
+                if buffer is None:
+                    f_dst.close()
+                    f_dst = None
+                    self.stats["files"] += 1
+                    finish(job, "pipelined")
+                    continue
+                if not self.should_continue():
+                    self._free.put(buffer)
+                    break
+                with memoryview(buffer) as view:
+                    chunk = view if n == len(view) else view[:n]
+                    self.write(f_dst.fileno(), chunk)
+                    if job["digest"] is not None:
+                        job["digest"].update(chunk)
+                self._free.put(buffer)
+                self.stats["bytes"] += n
+                on_chunk(n)
+        except BaseException:
+            if f_dst is not None:
+                f_dst.close()
+                if abandon:
+                    abandon(current_job)
+            raise
+        if f_dst is not None:
+            # Остановлены посреди файла: закрываем его и даем вызывающему решить, что с ним делать
+            f_dst.close()
+            finish(current_job, None)
@@ -0,0 +1,157 @@
+"""Порядок копирования файлов и журнал скорости для разных порядков и устройств.
+
+Порядки обхода:
+    manifest  — как в манифесте: по алфавиту, каталог раньше содержимого
+    inode     — по номеру inode источника: на FAT/ext* он обычно растет вместе
+                с положением данных на диске, поэтому чтение идет без скачков
+    largest   — сначала крупные файлы: потоки пула загружаются равномернее
+    directory — файлы сгруппированы по каталогам, внутри каталога по inode
+
+После каждого полного копирования его скорость дописывается в журнал
+throughput.jsonl вместе с классом устройств источника и назначения. Режим
+"auto" сначала по разу пробует порядки, которых для этой пары устройств еще
+нет в журнале, а затем выбирает самый быстрый из них.
+
+Сводка по журналу:
+    python planner.py throughput.jsonl
+"""
+import os
+import sys
+import json
+import argparse
+import psutil
+
+
+ORDERINGS = ("manifest", "inode", "largest", "directory")
+THROUGHPUT_LOG = "throughput.jsonl"
+
+
+def plan_order(files, ordering="manifest"):
+    """Возвращает записи манифеста в порядке копирования для выбранного порядка."""
+    if ordering == "manifest":
+        return list(files)
+    if ordering == "inode":
+        return sorted(files, key=lambda e: e.get("inode", 0))
+    if ordering == "largest":
+        return sorted(files, key=lambda e: e["size"], reverse=True)
+    if ordering == "directory":
+        return sorted(files, key=lambda e: (os.path.dirname(e["rel_path"]), e.get("inode", 0)))
+    raise ValueError(f"Неизвестный порядок копирования: {ordering}")
+
+
+def device_class(path):
+    """Описывает устройство, на котором лежит path: файловая система и тип диска.
+
+    Например "vfat" или "ext4/hdd". Тип диска (hdd/ssd) определяется только в
+    Linux по /sys/block; если путь не найден среди разделов, возвращает "unknown".
+    """
+    path = os.path.abspath(path)
+    best = None
+    try:
+        partitions = psutil.disk_partitions(all=True)
+    except (OSError, psutil.Error):
+        return "unknown"
+    for part in partitions:
+        mount = part.mountpoint
+        inside = path == mount or path.startswith(mount.rstrip(os.sep) + os.sep)
+        if inside and (best is None or len(mount) > len(best.mountpoint)):
+            best = part
+    if best is None:
+        return "unknown"
+    rotational = _rotational(best.device)
+    if rotational is None:
+        return best.fstype
+    return f"{best.fstype}/{'hdd' if rotational else 'ssd'}"
+
+
+def _rotational(device):
+    """Читает признак вращающегося диска из /sys/block (только Linux)."""
+    name = os.path.basename(os.path.realpath(device)) if device else ""
+    # Для раздела (sda1, nvme0n1p1) признак лежит у родительского диска
+    while name:
+        try:
+            with open(f"/sys/class/block/{name}/queue/rotational", "r") as f:
+                return f.read().strip() == "1"
+        except OSError:
+            pass
+        try:
+            parent = os.path.basename(os.path.dirname(os.path.realpath(f"/sys/class/block/{name}")))
+        except OSError:
+            return None
+        if parent == name or parent == "block":
+            return None
+        name = parent
+    return None
+
+
+def record_throughput(log_path, record):
+    """Дописывает результат копирования в журнал скорости; ошибки записи не мешают копированию."""
+    try:
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+
+
+def load_throughput(log_path):
+    """Читает журнал скорости, пропуская поврежденные строки."""
+    records = []
+    try:
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return records
+
+
+def summarize(records):
+    """Средняя скорость (МБ/с и файлов/с) по каждой паре устройств и порядку."""
+    summary = {}
+    for record in records:
+        key = (record.get("devices", "unknown"), record.get("ordering", "manifest"))
+        item = summary.setdefault(key, {"runs": 0, "mb_per_s": 0.0, "files_per_s": 0.0})
+        item["runs"] += 1
+        item["mb_per_s"] += record.get("mb_per_s", 0.0)
+        item["files_per_s"] += record.get("files_per_s", 0.0)
+    for item in summary.values():
+        item["mb_per_s"] /= item["runs"]
+        item["files_per_s"] /= item["runs"]
+    return summary
+
+
+def best_ordering(log_path, devices, default="manifest"):
+    """Выбирает порядок для пары устройств.
+
+    Пока в журнале есть не все порядки, возвращает первый неизмеренный
+    (начиная с default), иначе — порядок с наибольшей средней скоростью.
+    """
+    measured = {}
+    for (key, ordering), item in summarize(load_throughput(log_path)).items():
+        if key == devices and ordering in ORDERINGS:
+            measured[ordering] = item["mb_per_s"]
+    for ordering in (default,) + ORDERINGS:
+        if ordering not in measured:
+            return ordering
+    return max(measured, key=measured.get)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сводка скорости копирования по порядкам обхода и устройствам")
+    parser.add_argument("log", nargs="?", default=THROUGHPUT_LOG, help="журнал скорости")
+    args = parser.parse_args(argv)
+    summary = summarize(load_throughput(args.log))
+    if not summary:
+        print("Журнал скорости пуст")
+        return 1
+    print(f"{'устройства':<28} {'порядок':<10} {'запусков':>8} {'МБ/с':>9} {'файлов/с':>10}")
+    for (devices, ordering), item in sorted(summary.items()):
+        print(f"{devices:<28} {ordering:<10} {item['runs']:>8} {item['mb_per_s']:>9.1f} {item['files_per_s']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
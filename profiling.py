@@ -0,0 +1,167 @@
+"""Встроенное профилирование: cProfile и tracemalloc без внешних инструментов.
+
+Профилировщик включается настройкой "profile_dir" в settings.json, ключом
+--profile у main.py или cli.py. Обернутые им функции (поток копирования,
+обработчики изменений каталога Epic Games) профилируются cProfile, а при
+выходе из программы в папку profile_dir записываются:
+
+    <имя>.prof       статистика cProfile (python -m pstats <имя>.prof, snakeviz)
+    <имя>.txt        те же данные текстом: функции с наибольшим общим временем
+    summary.txt      число вызовов, время и прирост памяти по каждой функции
+    allocations.txt  места в коде с наибольшим объемом выделенной памяти
+                     и наибольшим приростом с момента запуска (tracemalloc)
+
+cProfile видит только поток, в котором вызвана обернутая функция: при
+workers > 1 время пула потоков попадает в профиль как ожидание, поэтому для
+разбора самого копирования удобнее workers = 1. Если обернутая функция
+вызывается из другой обернутой в том же потоке, она учитывается в профиле
+внешней, а в summary.txt для нее считаются только вызовы, время и память.
+В Python 3.12+ одновременно может работать только один cProfile на весь
+процесс, поэтому вызов, начатый, пока профилируется другой (обработчик
+каталога во время копирования), тоже учитывается только в summary.txt.
+"""
+import os
+import io
+import time
+import atexit
+import pstats
+import cProfile
+import threading
+import tracemalloc
+
+
+# Сколько строк выводить в текстовых сводках
+PROFILE_TOP = 30
+
+# Глубина стека, которую запоминает tracemalloc для каждого выделения
+TRACEMALLOC_FRAMES = 1
+
+# Выделения памяти загрузчиком модулей и самими профилировщиками в сводку не попадают
+ALLOCATION_FILTERS = [
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+]
+
+
+class Profiler:
+    """Профилирует выбранные функции и сохраняет результаты при выходе."""
+
+    def __init__(self, directory, trace_memory=True, top=PROFILE_TOP):
+        self.directory = directory
+        self.trace_memory = trace_memory
+        self.top = top
+        self.profiles = {}
+        self.stats = {}
+        self._start_snapshot = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._dumped = False
+
+    def start(self):
+        """Начинает отслеживать память и регистрирует сохранение результатов при выходе."""
+        os.makedirs(self.directory, exist_ok=True)
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._start_snapshot = tracemalloc.take_snapshot()
+        atexit.register(self.dump)
+        return self
+
+    def wrap(self, name, func):
+        """Возвращает обертку func, профилирующую каждый ее вызов под именем name."""
+        def wrapper(*args, **kwargs):
+            return self.call(name, func, *args, **kwargs)
+
+        wrapper.__name__ = getattr(func, "__name__", name)
+        wrapper.__doc__ = getattr(func, "__doc__", None)
+        return wrapper
+
+    def call(self, name, func, *args, **kwargs):
+        """Вызывает func под профилировщиком name и учитывает время и память вызова."""
+        with self._lock:
+            stats = self.stats.setdefault(name, {"calls": 0, "seconds": 0.0, "memory": 0})
+            profile = None
+            if not getattr(self._local, "active", False):
+                profile = self.profiles.get(name)
+                if profile is None:
+                    profile = self.profiles[name] = cProfile.Profile()
+        memory_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        start = time.perf_counter()
+        try:
+            if profile is not None:
+                try:
+                    profile.enable()
+                except ValueError:
+                    # Python 3.12+: cProfile работает через sys.monitoring, и пока
+                    # профилируется другой вызов (например, поток копирования),
+                    # второй профилировщик включить нельзя
+                    profile = None
+            if profile is None:
+                return func(*args, **kwargs)
+            self._local.active = True
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                self._local.active = False
+        finally:
+            seconds = time.perf_counter() - start
+            memory_after = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+            with self._lock:
+                stats["calls"] += 1
+                stats["seconds"] += seconds
+                stats["memory"] += memory_after - memory_before
+
+    def dump(self):
+        """Сохраняет профили и сводки; повторный вызов ничего не делает."""
+        if self._dumped:
+            return
+        self._dumped = True
+        if self.trace_memory and tracemalloc.is_tracing():
+            # Снимок берется до сохранения профилей, чтобы в него не попала память самого дампа
+            self.dump_allocations()
+        with self._lock:
+            profiles = dict(self.profiles)
+            stats = {name: dict(item) for name, item in self.stats.items()}
+        for name, profile in profiles.items():
+            profile.create_stats()
+            if not profile.stats:
+                # Все вызовы прошли без cProfile: данные есть только в summary.txt
+                continue
+            profile.dump_stats(os.path.join(self.directory, f"{name}.prof"))
+            text = io.StringIO()
+            pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(self.top)
+            self._write(f"{name}.txt", text.getvalue())
+
+        lines = [f"{'функция':<28} {'вызовов':>8} {'время, с':>10} {'память, КБ':>11}"]
+        for name, item in sorted(stats.items(), key=lambda pair: -pair[1]["seconds"]):
+            lines.append(f"{name:<28} {item['calls']:>8} {item['seconds']:>10.3f} {item['memory'] / 1024:>11.1f}")
+        self._write("summary.txt", "\n".join(lines) + "\n")
+
+    def dump_allocations(self):
+        """Сохраняет места в коде, выделившие больше всего памяти, без выделений самих профилировщиков."""
+        snapshot = tracemalloc.take_snapshot().filter_traces(ALLOCATION_FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Сейчас выделено {current / 1024 / 1024:.1f} МБ, пик {peak / 1024 / 1024:.1f} МБ", ""]
+        lines.append(f"Больше всего памяти ({self.top}):")
+        lines.extend(str(stat) for stat in snapshot.statistics("lineno")[:self.top])
+        if self._start_snapshot is not None:
+            lines.append("")
+            lines.append(f"Наибольший прирост с начала профилирования ({self.top}):")
+            start = self._start_snapshot.filter_traces(ALLOCATION_FILTERS)
+            lines.extend(str(stat) for stat in snapshot.compare_to(start, "lineno")[:self.top])
+        self._write("allocations.txt", "\n".join(lines) + "\n")
+
+    def _write(self, filename, text):
+        with open(os.path.join(self.directory, filename), "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def start_profiler(directory, trace_memory=True):
+    """Создает и запускает профилировщик или возвращает None, если папка не задана."""
+    if not directory:
+        return None
+    return Profiler(directory, trace_memory).start()
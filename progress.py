@@ -0,0 +1,73 @@
+import time
+import threading
+
+
+class ProgressAggregator:
+    """Периодически опрашивает счетчики копирования и сообщает прогресс с заданной частотой.
+
+    Потоки копирования только увеличивают счетчики, а расчет скорости, оставшегося
+    времени и отправка прогресса происходят здесь не чаще rate_hz раз в секунду,
+    поэтому затраты на отчетность не растут вместе со скоростью копирования.
+    Скорость сглаживается экспоненциальным скользящим средним (EWMA).
+
+    sample() должна возвращать словарь со счетчиками copied_size, done_size,
+    total_size, done_files, total_files, skipped_files и skipped_size;
+    report(stats) получает их вместе с полями progress, speed (МБ/с) и
+    remaining_seconds (None, пока скорость неизвестна).
+    """
+
+    def __init__(self, sample, report, rate_hz=10, alpha=0.3):
+        self.sample = sample
+        self.report = report
+        self.interval = 1.0 / max(0.1, float(rate_hz))
+        self.alpha = alpha
+        self.speed = None
+        self._last_time = None
+        self._last_copied = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запускает фоновый поток опроса."""
+        self._last_time = time.monotonic()
+        self._last_copied = self.sample()["copied_size"]
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="progress-aggregator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Останавливает опрос и отправляет последнее, итоговое значение прогресса."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.tick()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.tick()
+
+    def tick(self):
+        """Снимает счетчики, обновляет сглаженную скорость и отправляет прогресс."""
+        stats = self.sample()
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        if elapsed > 0:
+            instant = (stats["copied_size"] - self._last_copied) / (1024 * 1024) / elapsed
+            if self.speed is None:
+                self.speed = instant
+            else:
+                self.speed = self.alpha * instant + (1 - self.alpha) * self.speed
+            self._last_time = now
+            self._last_copied = stats["copied_size"]
+
+        speed = self.speed or 0.0
+        total_size = stats["total_size"]
+        stats["progress"] = int((stats["done_size"] / total_size) * 100) if total_size else 100
+        stats["speed"] = speed
+        if speed > 0:
+            stats["remaining_seconds"] = (total_size - stats["done_size"]) / (speed * 1024 * 1024)
+        else:
+            stats["remaining_seconds"] = None
+        self.report(stats)
@@ -0,0 +1,121 @@
+"""Хранимый на флешке манифест хешей файлов игры.
+
+Файл .egres-hashes.json лежит в корне папки игры (usb_path/<игра>) и содержит
+для каждого файла размер, время изменения и хеш. Пока размер и mtime файла
+не менялись, хеш берется из манифеста и источник не перечитывается.
+
+Заранее построить манифест для папки:
+    python sidecar.py E:\\Games\\Fortnite --algorithm sha256
+"""
+import os
+import sys
+import json
+import argparse
+import threading
+from manifest import scan_tree
+from hashing import HASH_ALGORITHMS, hash_file
+
+
+SIDECAR_NAME = ".egres-hashes.json"
+SIDECAR_VERSION = 1
+
+
+class SidecarManifest:
+    """Кэш хешей исходных файлов, который хранится рядом с ними."""
+
+    def __init__(self, root, algorithm="md5"):
+        self.root = root
+        self.path = os.path.join(root, SIDECAR_NAME)
+        self.algorithm = algorithm
+        self.files = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """Загружает манифест; при другом алгоритме или поврежденном файле начинает с пустого."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != SIDECAR_VERSION or data.get("algorithm") != self.algorithm:
+            return
+        self.files = data.get("files", {})
+
+    @staticmethod
+    def key(entry):
+        """Ключ записи: относительный путь с прямыми слешами, чтобы флешка читалась на любой ОС."""
+        return entry["rel_path"].replace(os.sep, "/")
+
+    def digest_for(self, entry):
+        """Возвращает сохраненный хеш файла, если его размер и mtime не изменились."""
+        record = self.files.get(self.key(entry))
+        if record is None or record[0] != entry["size"] or record[1] != entry["mtime"]:
+            return None
+        return record[2]
+
+    def update(self, entry, digest):
+        """Запоминает хеш файла для текущих размера и mtime."""
+        with self._lock:
+            self.files[self.key(entry)] = [entry["size"], entry["mtime"], digest]
+            self.dirty = True
+
+    def prune(self, manifest):
+        """Удаляет записи о файлах, которых больше нет в источнике."""
+        present = {self.key(entry) for entry in manifest if entry["type"] == "file"}
+        with self._lock:
+            for key in list(self.files):
+                if key not in present:
+                    del self.files[key]
+                    self.dirty = True
+
+    def save(self):
+        """Атомарно сохраняет манифест, если в нем есть изменения.
+
+        Манифест — только кэш, поэтому ошибки записи (например, флешка защищена
+        от записи) игнорируются.
+        """
+        with self._lock:
+            if not self.dirty:
+                return False
+            data = {"version": SIDECAR_VERSION, "algorithm": self.algorithm, "files": self.files}
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                return False
+            self.dirty = False
+            return True
+
+
+def build_sidecar(root, algorithm="md5"):
+    """Досчитывает хеши всех файлов папки, которых нет в манифесте или которые изменились."""
+    sidecar = SidecarManifest(root, algorithm)
+    manifest = scan_tree(root, exclude=(SIDECAR_NAME,))
+    buffer = bytearray(1024 * 1024)
+    hashed = 0
+    for entry in manifest:
+        if entry["type"] == "file" and sidecar.digest_for(entry) is None:
+            sidecar.update(entry, hash_file(entry["path"], algorithm, buffer))
+            hashed += 1
+    sidecar.prune(manifest)
+    sidecar.save()
+    return hashed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Построение манифеста хешей для папки игры на флешке")
+    parser.add_argument("folders", nargs="+", help="папки игр (usb_path/<игра>)")
+    parser.add_argument("--algorithm", choices=HASH_ALGORITHMS, default="md5")
+    args = parser.parse_args(argv)
+    for folder in args.folders:
+        hashed = build_sidecar(folder, args.algorithm)
+        print(f"{folder}: захешировано файлов: {hashed}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
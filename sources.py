@@ -0,0 +1,100 @@
+import os
+import errno
+import threading
+
+
+# Ошибки, после которых флешку считаем отключенной и больше с нее не читаем
+LOST_SOURCE_ERRNOS = {errno.EIO, errno.ENODEV, errno.ENXIO}
+
+# Скорость, которую предполагаем у еще не измеренной флешки, байт/с
+DEFAULT_SOURCE_RATE = 20 * 1024 * 1024
+
+
+class SourceSelector:
+    """Распределяет чтение файлов между несколькими флешками с копиями одной игры.
+
+    Для каждой флешки копится измеренная скорость чтения (экспоненциальное
+    скользящее среднее по файлам) и объем уже начатых, но не законченных
+    файлов. Очередной файл отдается флешке, которая закончит его раньше
+    остальных с учетом ее очереди, поэтому быстрая флешка получает больше
+    работы. Отключенная флешка исключается, и ее файлы читаются с остальных.
+    """
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.sources = []
+        self._lock = threading.Lock()
+
+    def add(self, root, files=None):
+        """Добавляет флешку; files — относительные пути файлов, которые с нее можно читать (None — все)."""
+        source = {
+            "root": root, "files": files, "rate": None, "in_flight": 0,
+            "bytes": 0, "seconds": 0.0, "copied_files": 0, "failed": False,
+        }
+        self.sources.append(source)
+        return source
+
+    def path_for(self, source, entry):
+        """Возвращает путь к файлу манифеста на этой флешке."""
+        if not entry["rel_path"]:
+            return source["root"]
+        return os.path.join(source["root"], entry["rel_path"])
+
+    def pick(self, entry, exclude=()):
+        """Выбирает флешку для чтения файла и ставит файл в ее очередь; None — читать неоткуда."""
+        with self._lock:
+            candidates = [
+                s for s in self.sources
+                if not s["failed"] and s not in exclude
+                and (s["files"] is None or entry["rel_path"] in s["files"])
+            ]
+            if not candidates:
+                return None
+            known = [s["rate"] for s in self.sources if s["rate"]]
+            # Неизмеренную флешку считаем не медленнее самой быстрой, чтобы ее попробовать
+            fallback_rate = max(known) if known else DEFAULT_SOURCE_RATE
+            source = min(
+                candidates,
+                key=lambda s: (s["in_flight"] + entry["size"]) / (s["rate"] or fallback_rate),
+            )
+            source["in_flight"] += entry["size"]
+            return source
+
+    def finish(self, source, size, copied, seconds):
+        """Снимает файл с очереди флешки и учитывает скорость, с которой прочитано copied байт."""
+        with self._lock:
+            source["in_flight"] -= size
+            if copied <= 0 or seconds <= 0:
+                return
+            source["bytes"] += copied
+            source["seconds"] += seconds
+            source["copied_files"] += 1
+            rate = copied / seconds
+            if source["rate"] is None:
+                source["rate"] = rate
+            else:
+                source["rate"] = self.alpha * rate + (1 - self.alpha) * source["rate"]
+
+    def fail(self, source):
+        """Исключает флешку, с которой больше нельзя читать."""
+        with self._lock:
+            source["failed"] = True
+
+    def is_lost(self, source, error):
+        """Проверяет, что ошибка означает отключение флешки: ее корня больше нет или ошибка ввода-вывода."""
+        return not os.path.exists(source["root"]) or error.errno in LOST_SOURCE_ERRNOS
+
+    def stats(self):
+        """Возвращает статистику чтения по флешкам: объем, время, средняя скорость."""
+        with self._lock:
+            return [
+                {
+                    "root": s["root"],
+                    "bytes": s["bytes"],
+                    "files": s["copied_files"],
+                    "seconds": s["seconds"],
+                    "mb_per_s": s["bytes"] / (1024 * 1024) / s["seconds"] if s["seconds"] else 0.0,
+                    "failed": s["failed"],
+                }
+                for s in self.sources
+            ]
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# Модули проекта лежат в корне репозитория, а не в пакете
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_tree(tmp_path):
+    """Создает папку игры из словаря {относительный путь: содержимое}."""
+    def make(name, files):
+        root = tmp_path / name
+        for rel_path, data in files.items():
+            path = root / rel_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+        return str(root)
+    return make
+
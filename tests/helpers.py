@@ -0,0 +1,17 @@
+"""Общие функции тестов."""
+import os
+
+
+def read_tree(root):
+    """Читает все файлы папки в словарь {относительный путь: содержимое}."""
+    result = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            result[os.path.relpath(path, root).replace(os.sep, "/")] = open(path, "rb").read()
+    return result
+
+
+def engine_options(**options):
+    """Параметры CopyEngine для тестов: без манифеста хешей рядом с исходной папкой."""
+    return {"sidecar": False, **options}
@@ -0,0 +1,67 @@
+import os
+
+from engine import CopyEngine, part_path
+from helpers import read_tree, engine_options
+
+
+MB = 1024 * 1024
+
+
+def test_stale_part_files_removed(make_tree):
+    src = make_tree("src", {"a.bin": b"new"})
+    dst = make_tree("dst", {".a.bin.egres-part": b"old", "sub/.gone.egres-part": b"old"})
+    engine = CopyEngine(src, dst, **engine_options())
+    engine.run()
+    assert engine.error is None
+    assert read_tree(dst) == {"a.bin": b"new"}
+
+
+def test_failed_copy_leaves_no_part_file(make_tree):
+    src = make_tree("src", {"a.bin": os.urandom(3 * MB)})
+    dst = os.path.join(os.path.dirname(src), "dst")
+
+    class FailingEngine(CopyEngine):
+        def on_chunk_copied(self, size):
+            raise OSError("Ошибка чтения")
+
+    engine = FailingEngine(src, dst, **engine_options(copy_strategy="buffered"))
+    engine.run()
+    assert isinstance(engine.error, OSError)
+    assert read_tree(dst) == {}
+
+
+def test_cancel_keeps_previous_version(make_tree):
+    src = make_tree("src", {"a.bin": os.urandom(3 * MB)})
+    dst = make_tree("dst", {"a.bin": b"old"})
+
+    class CancellingEngine(CopyEngine):
+        def on_chunk_copied(self, size):
+            super().on_chunk_copied(size)
+            self.cancel()
+
+    engine = CancellingEngine(src, dst, **engine_options(copy_strategy="buffered"))
+    engine.run()
+    assert engine.error is None
+    assert read_tree(dst) == {"a.bin": b"old"}
+    assert not os.path.exists(part_path(os.path.join(dst, "a.bin")))
+
+
+def test_job_durability_renames_after_sync(make_tree):
+    src = make_tree("src", {"a.bin": b"new", "sub/b.bin": b"data"})
+    dst = make_tree("dst", {"a.bin": b"old"})
+    seen = {}
+
+    class ObservedEngine(CopyEngine):
+        def sync_destination(self):
+            # До общего сброса на диск файлы игры еще старые, а журнал ничего не отметил
+            seen["before"] = read_tree(dst)
+            with open(self.journal.path, encoding="utf-8") as f:
+                seen["journal"] = f.read()
+            super().sync_destination()
+
+    engine = ObservedEngine(src, dst, **engine_options(durability="job"))
+    engine.run()
+    assert engine.error is None
+    assert seen["before"] == {"a.bin": b"old", ".a.bin.egres-part": b"new", "sub/.b.bin.egres-part": b"data"}
+    assert '"done": true' not in seen["journal"]
+    assert read_tree(dst) == {"a.bin": b"new", "sub/b.bin": b"data"}
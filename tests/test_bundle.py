@@ -0,0 +1,80 @@
+import os
+import json
+import zipfile
+
+import pytest
+
+from bundle import INDEX_NAME, pack_folder, read_bundle_index
+from engine import CopyEngine
+from hashing import hash_file
+from helpers import read_tree, engine_options
+
+
+FILES = {
+    "Game.exe": os.urandom(200 * 1024),
+    "Content/Paks/data.pak": os.urandom(1024 * 1024) + bytes(1024 * 1024),
+    "Content/config.ini": b"[Game]\nQuality=High\n" * 500,
+    "empty.txt": b"",
+}
+
+
+def restore(bundle, dst, **options):
+    engine = CopyEngine(bundle, dst, **engine_options(**options))
+    engine.run()
+    assert engine.error is None
+    return engine
+
+
+@pytest.mark.parametrize("compress", [None, "zlib", "lzma"])
+def test_pack_and_restore_round_trip(make_tree, compress):
+    src = make_tree("Game", FILES)
+    bundle = pack_folder(src, compress=compress)
+    dst = os.path.join(os.path.dirname(src), "restored")
+
+    engine = restore(bundle, dst, decompress_workers=2)
+    assert read_tree(dst) == FILES
+    assert engine.integrity_report["checked"] == len(FILES)
+    assert not engine.integrity_report["failed"]
+    if compress:
+        _, index = read_bundle_index(bundle)
+        assert "Content/config.ini" in index["compressed"]
+
+
+def test_bundle_verify_reports_destination_path(make_tree):
+    src = make_tree("Game", FILES)
+    bundle = pack_folder(src)
+    dst = os.path.join(os.path.dirname(src), "restored")
+    restore(bundle, dst)
+    broken = os.path.join(dst, "Game.exe")
+    with open(broken, "r+b") as f:
+        f.write(b"MZ!")
+
+    report = CopyEngine(bundle, dst, **engine_options()).verify()
+    assert [item["path"] for item in report["failed"]] == [broken]
+
+
+def test_restore_version_1_bundle(make_tree, tmp_path):
+    """Бандлы первой версии (без раздела compressed в индексе) восстанавливаются как раньше."""
+    src = make_tree("Game", FILES)
+    bundle = str(tmp_path / "Game.egres")
+    index = {"version": 1, "algorithm": "md5", "files": {}, "dirs": ["Content", "Content/Paks"]}
+    with zipfile.ZipFile(bundle, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, data in FILES.items():
+            path = os.path.join(src, name)
+            zf.writestr(name, data)
+            index["files"][name] = [len(data), os.path.getmtime(path), hash_file(path, "md5")]
+        zf.writestr(INDEX_NAME, json.dumps(index))
+    dst = str(tmp_path / "restored")
+
+    restore(bundle, dst)
+    assert read_tree(dst) == FILES
+    mtime = os.path.getmtime(os.path.join(dst, "Game.exe"))
+    assert abs(mtime - os.path.getmtime(os.path.join(src, "Game.exe"))) < 2
+
+
+def test_unsupported_bundle_version(tmp_path):
+    bundle = str(tmp_path / "Game.egres")
+    with zipfile.ZipFile(bundle, "w") as zf:
+        zf.writestr(INDEX_NAME, json.dumps({"version": 99, "files": {}, "dirs": []}))
+    with pytest.raises(ValueError):
+        read_bundle_index(bundle)
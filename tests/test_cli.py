@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+import cli
+from helpers import read_tree
+
+
+def test_load_copy_options(tmp_path):
+    settings = tmp_path / "settings.json"
+    settings.write_text(json.dumps({"copy": {"workers": 2, "durability": "file"}}), encoding="utf-8")
+    options = cli.load_copy_options(str(settings), ["workers=4", "ordering=inode"])
+    assert options == {"workers": 4, "durability": "file", "ordering": "inode"}
+
+
+@pytest.mark.parametrize("overrides", [["bogus=1"], ["workers"]])
+def test_load_copy_options_rejects_bad_input(overrides):
+    with pytest.raises(ValueError):
+        cli.load_copy_options(None, overrides)
+
+
+def test_bad_option_is_an_error_not_an_integrity_failure(make_tree, tmp_path, capsys):
+    src = make_tree("src", {"a.bin": b"data"})
+    dst = str(tmp_path / "dst")
+    assert cli.main(["restore", src, dst, "--set", "bogus=1"]) == cli.EXIT_ERROR
+    assert cli.main(["restore", src, dst, "--set", "workers=[1]"]) == cli.EXIT_ERROR
+    assert "bogus" in capsys.readouterr().err
+
+
+def test_restore_and_verify(make_tree, tmp_path):
+    src = make_tree("src", {"a.bin": b"data", "sub/b.bin": b"more"})
+    dst = str(tmp_path / "dst")
+    common = ["--settings", "", "-q", "--set", "metrics_report=null", "--set", "throughput_log=null"]
+    assert cli.main(["restore", src, dst] + common) == cli.EXIT_OK
+    assert read_tree(dst) == {"a.bin": b"data", "sub/b.bin": b"more"}
+    (tmp_path / "dst" / "a.bin").write_bytes(b"DATA")
+    assert cli.main(["verify", src, dst] + common) == cli.EXIT_INTEGRITY
+
+
+def test_verify_checks_mirrors(make_tree, tmp_path):
+    src = make_tree("src", {"a.bin": b"data"})
+    dst, mirror = str(tmp_path / "dst"), str(tmp_path / "mirror")
+    common = ["--settings", "", "-q", "--set", "metrics_report=null", "--set", "throughput_log=null",
+              "--set", "sidecar=false", "--mirror", mirror]
+    assert cli.main(["restore", src, dst] + common) == cli.EXIT_OK
+    assert read_tree(mirror) == {"a.bin": b"data"}
+    (tmp_path / "mirror" / "a.bin").write_bytes(b"DATA")
+    assert cli.main(["verify", src, dst] + common) == cli.EXIT_INTEGRITY
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from engine import CopyEngine
+from helpers import read_tree, engine_options
+
+
+FILES = {
+    "Game.exe": os.urandom(300 * 1024),
+    "Content/Paks/data.pak": os.urandom(3 * 1024 * 1024),
+    "Content/config.ini": b"[Game]\n",
+    "empty.txt": b"",
+}
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"workers": 3},
+    {"pipeline": True},
+    {"sparse": True},
+], ids=["sequential", "parallel", "pipeline", "sparse"])
+def test_fanout_round_trip(make_tree, tmp_path, options):
+    src = make_tree("src", FILES)
+    destinations = [str(tmp_path / "lib1" / "Game"), str(tmp_path / "lib2" / "Game"), str(tmp_path / "lib3" / "Game")]
+    engine = CopyEngine(src, destinations, **engine_options(**options))
+    engine.run()
+    assert engine.error is None
+    for dst in destinations:
+        assert read_tree(dst) == FILES
+    assert engine.integrity_report["checked"] == len(FILES)
+    assert not engine.integrity_report["failed"]
+
+
+def test_fanout_verify_names_broken_copy(make_tree, tmp_path):
+    src = make_tree("src", FILES)
+    destinations = [str(tmp_path / "lib1" / "Game"), str(tmp_path / "lib2" / "Game")]
+    engine = CopyEngine(src, destinations, **engine_options())
+    engine.run()
+    assert engine.error is None
+    broken = os.path.join(destinations[1], "Content", "config.ini")
+    with open(broken, "wb") as f:
+        f.write(b"[Game]\n!")
+
+    report = CopyEngine(src, destinations, **engine_options()).verify()
+    assert len(report["failed"]) == 1
+    assert broken in report["failed"][0]["error"]
@@ -0,0 +1,56 @@
+import os
+
+from engine import CopyEngine
+from helpers import read_tree, engine_options
+
+
+FILES = {
+    "Game.exe": os.urandom(100 * 1024),
+    "Content/data.pak": os.urandom(1024 * 1024),
+    "Content/config.ini": b"[Game]\n",
+}
+
+
+def restore(src, dst, **options):
+    engine = CopyEngine(src, dst, **engine_options(incremental=True, **options))
+    engine.run()
+    assert engine.error is None
+    assert not engine.integrity_report["failed"]
+    return engine
+
+
+def test_incremental_skips_unchanged_files(make_tree):
+    src = make_tree("src", FILES)
+    dst = os.path.join(os.path.dirname(src), "dst")
+    first = restore(src, dst)
+    assert (first.copied_files, first.skipped_files, first.skipped_size) == (3, 0, 0)
+
+    second = restore(src, dst)
+    assert second.copied_files == 0
+    assert second.skipped_files == 3
+    assert second.skipped_size == sum(len(data) for data in FILES.values())
+
+    with open(os.path.join(src, "Content", "config.ini"), "wb") as f:
+        f.write(b"[Game]\nFullscreen=1\n")
+    third = restore(src, dst)
+    assert third.copied_files == 1
+    assert third.skipped_files == 2
+    assert third.skipped_size == len(FILES["Game.exe"]) + len(FILES["Content/data.pak"])
+    assert read_tree(dst)["Content/config.ini"] == b"[Game]\nFullscreen=1\n"
+
+
+def test_incremental_hash_skips_files_with_other_mtime(make_tree):
+    src = make_tree("src", FILES)
+    dst = os.path.join(os.path.dirname(src), "dst")
+    restore(src, dst)
+    # Лаунчер переписал файл тем же содержимым: время изменения другое
+    pak = os.path.join(dst, "Content", "data.pak")
+    os.utime(pak, (1_000_000_000, 1_000_000_000))
+
+    by_hash = restore(src, dst, incremental_hash=True)
+    assert (by_hash.copied_files, by_hash.skipped_files) == (0, 3)
+    assert abs(os.stat(pak).st_mtime - os.stat(os.path.join(src, "Content", "data.pak")).st_mtime) < 2
+
+    os.utime(pak, (1_000_000_000, 1_000_000_000))
+    by_stat = restore(src, dst)
+    assert (by_stat.copied_files, by_stat.skipped_files) == (1, 2)
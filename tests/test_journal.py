@@ -0,0 +1,94 @@
+import os
+
+from engine import CopyEngine, part_path
+from journal import CopyJournal, journal_path, verify_resume_point
+from helpers import read_tree, engine_options
+
+
+MB = 1024 * 1024
+
+
+class CancellingEngine(CopyEngine):
+    """Отменяет копирование, как только скопировано cancel_after байт."""
+
+    def __init__(self, *args, cancel_after, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cancel_after = cancel_after
+
+    def on_chunk_copied(self, size):
+        super().on_chunk_copied(size)
+        if self.copied_size >= self.cancel_after:
+            self.cancel()
+
+
+def test_journal_round_trip(tmp_path):
+    src, dst = str(tmp_path / "src"), str(tmp_path / "dst")
+    done = {"rel_path": "a.bin", "size": 10, "mtime": 1.0}
+    partial = {"rel_path": "big.pak", "size": 100, "mtime": 2.0}
+
+    journal = CopyJournal(src, dst)
+    assert not journal.resumed
+    journal.mark_done(done)
+    journal.checkpoint(partial, 40)
+    journal.close()
+
+    journal = CopyJournal(src, dst)
+    assert journal.resumed
+    assert journal.is_done(done)
+    assert journal.resume_offset(partial) == 40
+    # Файл изменился с прошлого раза — продолжать его нельзя
+    assert journal.resume_offset(dict(partial, mtime=3.0)) == 0
+    journal.remove()
+    assert not os.path.exists(journal_path(dst))
+
+
+def test_journal_ignores_other_pair_and_torn_line(tmp_path):
+    src, dst = str(tmp_path / "src"), str(tmp_path / "dst")
+    entry = {"rel_path": "a.bin", "size": 10, "mtime": 1.0}
+    journal = CopyJournal(src, dst)
+    journal.mark_done(entry)
+    journal.close()
+    with open(journal_path(dst), "a", encoding="utf-8") as f:
+        f.write('{"path": "b.bin", "si')
+
+    journal = CopyJournal(src, dst)
+    assert journal.is_done(entry)
+    journal.close()
+    assert not CopyJournal(str(tmp_path / "other"), dst).resumed
+
+
+def test_verify_resume_point(tmp_path):
+    src, dst = tmp_path / "src.bin", tmp_path / "dst.bin"
+    data = os.urandom(64 * 1024)
+    src.write_bytes(data)
+    dst.write_bytes(data[:32 * 1024])
+    assert verify_resume_point(str(src), str(dst), 32 * 1024) == 32 * 1024
+    # Записано меньше, чем отмечено в журнале
+    assert verify_resume_point(str(src), str(dst), 48 * 1024) == 0
+    dst.write_bytes(bytes([data[0] ^ 0xFF]) + data[1:32 * 1024])
+    assert verify_resume_point(str(src), str(dst), 32 * 1024) == 0
+
+
+def test_resume_checkpointed_large_file(make_tree):
+    data = os.urandom(5 * MB)
+    src = make_tree("src", {"Content/big.pak": data, "small.txt": b"hello"})
+    dst = os.path.join(os.path.dirname(src), "dst")
+    options = engine_options(journal_checkpoint_mb=1, copy_strategy="buffered")
+
+    first = CancellingEngine(src, dst, cancel_after=3 * MB, **options)
+    first.run()
+    assert first.error is None
+    big = os.path.join(dst, "Content", "big.pak")
+    assert os.path.exists(part_path(big))
+    assert not os.path.exists(big)
+    assert os.path.exists(journal_path(dst))
+
+    second = CopyEngine(src, dst, **options)
+    second.run()
+    assert second.error is None
+    # Крупный файл продолжен с контрольной точки, а не скопирован заново
+    assert second.skipped_size >= 2 * MB
+    assert not second.integrity_report["failed"]
+    assert read_tree(dst) == {"Content/big.pak": data, "small.txt": b"hello"}
+    assert not os.path.exists(journal_path(dst))
+
@@ -0,0 +1,37 @@
+import os
+import json
+
+from engine import CopyEngine
+from helpers import engine_options
+
+
+FILES = {"Game.exe": os.urandom(200 * 1024), "Content/data.pak": os.urandom(2 * 1024 * 1024)}
+
+
+def restore_report(src, tmp_path, **options):
+    report = tmp_path / "restore_metrics.json"
+    engine = CopyEngine(src, str(tmp_path / "dst"), **engine_options(metrics_report=str(report), **options))
+    engine.run()
+    assert engine.error is None
+    return engine, json.loads(report.read_text(encoding="utf-8"))
+
+
+def test_report_includes_pipeline_stats(make_tree, tmp_path):
+    engine, report = restore_report(make_tree("src", FILES), tmp_path, pipeline=True)
+    assert report["pipeline"] == engine.pipeline_stats
+    assert report["pipeline"]["files"] == len(FILES)
+
+
+def test_report_includes_source_stats(make_tree, tmp_path):
+    sources = [make_tree("usb1", FILES), make_tree("usb2", FILES)]
+    engine, report = restore_report(sources, tmp_path)
+    assert report["source_stats"] == engine.source_stats
+    assert [stats["root"] for stats in report["source_stats"]] == sources
+    assert sum(stats["files"] for stats in report["source_stats"]) == len(FILES)
+
+
+def test_report_includes_throttled_intervals(make_tree, tmp_path):
+    engine, report = restore_report(make_tree("src", FILES), tmp_path, adaptive_throttle=True)
+    assert report["throttled_intervals"] == engine.throttle.throttled_intervals
+    _, report = restore_report(make_tree("plain", FILES), tmp_path)
+    assert report["throttled_intervals"] is None
@@ -0,0 +1,41 @@
+import os
+import threading
+
+from engine import ByteBudget, CopyEngine
+from fast_copy import CHUNK_SIZE, BufferPool, copy_fd
+from helpers import read_tree, engine_options
+
+
+def test_budget_limits_buffers_handed_to_workers(tmp_path):
+    data = os.urandom(4 * CHUNK_SIZE)
+    src = tmp_path / "src.bin"
+    src.write_bytes(data)
+    budget = ByteBudget(CHUNK_SIZE)
+    pool = BufferPool()
+
+    def copy(i):
+        with open(src, "rb", buffering=0) as f_src, open(tmp_path / f"dst{i}.bin", "wb", buffering=0) as f_dst:
+            copy_fd(f_src.fileno(), f_dst.fileno(), "buffered", budget=budget, buffers=pool)
+
+    threads = [threading.Thread(target=copy, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Бюджет на один буфер: потоки копируют по очереди одним и тем же буфером
+    assert pool.allocated == 1
+    assert budget.in_flight == 0
+    for i in range(4):
+        assert (tmp_path / f"dst{i}.bin").read_bytes() == data
+
+
+def test_parallel_restore_with_small_budget(make_tree):
+    files = {f"Content/{i}.pak": os.urandom(CHUNK_SIZE + i) for i in range(6)}
+    src = make_tree("src", files)
+    dst = os.path.join(os.path.dirname(src), "dst")
+    engine = CopyEngine(src, dst, **engine_options(workers=4, max_buffered_mb=1, copy_strategy="buffered"))
+    engine.run()
+    assert engine.error is None
+    assert engine.budget.in_flight == 0
+    assert read_tree(dst) == files
+    assert not engine.integrity_report["failed"]
@@ -0,0 +1,79 @@
+import os
+import time
+import threading
+
+from engine import CopyEngine
+from helpers import read_tree, engine_options
+
+
+MB = 1024 * 1024
+FILES = {"Content/big.pak": os.urandom(4 * MB), "Game.exe": os.urandom(64 * 1024)}
+
+
+class PausingEngine(CopyEngine):
+    """Ставит копирование на паузу после первого скопированного блока."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.paused = threading.Event()
+
+    def on_chunk_copied(self, size):
+        super().on_chunk_copied(size)
+        if not self.paused.is_set():
+            self.pause()
+            self.paused.set()
+
+
+def start_paused(make_tree):
+    src = make_tree("src", FILES)
+    dst = os.path.join(os.path.dirname(src), "dst")
+    events = []
+    engine = PausingEngine(src, dst, callback=lambda event, data: events.append(event),
+                           **engine_options(copy_strategy="buffered"))
+    thread = threading.Thread(target=engine.run)
+    thread.start()
+    assert engine.paused.wait(5)
+    return engine, thread, dst, events
+
+
+def test_pause_holds_copy_until_resume(make_tree):
+    engine, thread, dst, events = start_paused(make_tree)
+    copied = engine.copied_size
+    time.sleep(0.3)
+    assert engine.is_paused()
+    assert engine.copied_size == copied < len(FILES["Content/big.pak"])
+
+    engine.resume()
+    thread.join(10)
+    assert not thread.is_alive()
+    assert engine.error is None
+    assert events[-1] == "finished"
+    assert read_tree(dst) == FILES
+    assert not engine.integrity_report["failed"]
+
+
+def test_cancel_while_paused(make_tree):
+    engine, thread, dst, events = start_paused(make_tree)
+    engine.cancel()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert engine.is_cancelled() and not engine.is_paused()
+    assert events[-1] == "cancelled"
+    assert "finished" not in events
+    assert engine.integrity_report is None
+    # Недописанный файл не подменяет собой готовый
+    assert not os.path.exists(os.path.join(dst, "Content", "big.pak"))
+
+
+def test_abandoned_iter_events_cancels(make_tree):
+    src = make_tree("src", FILES)
+    dst = os.path.join(os.path.dirname(src), "dst")
+    engine = CopyEngine(src, dst, **engine_options(copy_strategy="buffered", bandwidth_limit_mb=1))
+    start = time.monotonic()
+    for event, _ in engine.iter_events():
+        if event == "progress":
+            break
+    # Без отмены ограничение в 1 МБ/с копировало бы несколько секунд
+    assert time.monotonic() - start < 3
+    assert engine.is_cancelled()
+    assert engine.integrity_report is None
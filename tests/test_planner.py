@@ -0,0 +1,48 @@
+from planner import ORDERINGS, best_ordering, plan_order, record_throughput
+
+
+DEVICES = "vfat->ext4/ssd"
+
+
+def log_runs(path, runs, devices=DEVICES):
+    for ordering, mb_per_s in runs:
+        record_throughput(path, {"devices": devices, "ordering": ordering, "mb_per_s": mb_per_s, "files_per_s": 1.0})
+
+
+def test_best_ordering_tries_unmeasured_first(tmp_path):
+    log = str(tmp_path / "throughput.jsonl")
+    assert best_ordering(log, DEVICES) == "manifest"
+    log_runs(log, [("manifest", 50.0), ("inode", 90.0)])
+    assert best_ordering(log, DEVICES) == "largest"
+    # Замеры другой пары устройств не учитываются
+    log_runs(log, [("largest", 10.0), ("directory", 10.0)], devices="ntfs->ntfs/hdd")
+    assert best_ordering(log, DEVICES) == "largest"
+
+
+def test_best_ordering_picks_fastest_average(tmp_path):
+    log = str(tmp_path / "throughput.jsonl")
+    log_runs(log, [("manifest", 50.0), ("inode", 90.0), ("largest", 70.0), ("directory", 60.0)])
+    assert best_ordering(log, DEVICES) == "inode"
+    # Выбор идет по средней скорости, а не по лучшему запуску
+    log_runs(log, [("inode", 30.0), ("largest", 80.0)])
+    assert best_ordering(log, DEVICES) == "largest"
+
+
+def test_best_ordering_skips_torn_lines(tmp_path):
+    log = tmp_path / "throughput.jsonl"
+    log_runs(str(log), [(ordering, 10.0 * (i + 1)) for i, ordering in enumerate(ORDERINGS)])
+    with open(log, "a", encoding="utf-8") as f:
+        f.write('{"devices": "vfat->ext4/ssd", "ord')
+    assert best_ordering(str(log), DEVICES) == ORDERINGS[-1]
+
+
+def test_plan_order():
+    files = [
+        {"rel_path": "b/x.pak", "size": 10, "inode": 3},
+        {"rel_path": "a/y.pak", "size": 30, "inode": 2},
+        {"rel_path": "b/z.pak", "size": 20, "inode": 1},
+    ]
+    assert [e["inode"] for e in plan_order(files, "inode")] == [1, 2, 3]
+    assert [e["size"] for e in plan_order(files, "largest")] == [30, 20, 10]
+    assert [e["rel_path"] for e in plan_order(files, "directory")] == ["a/y.pak", "b/z.pak", "b/x.pak"]
+    assert plan_order(files) == files
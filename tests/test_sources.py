@@ -0,0 +1,63 @@
+import os
+import errno
+
+from engine import CopyEngine
+from helpers import read_tree, engine_options
+
+
+MB = 1024 * 1024
+
+
+class LosingEngine(CopyEngine):
+    """Имитирует отключение флешки lost_root посреди первого файла, читаемого с нее."""
+
+    def __init__(self, *args, lost_root, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lost_root = lost_root
+        self.reading_lost = False
+
+    def copy_job(self, job):
+        self.reading_lost = job["src"].startswith(self.lost_root) and not self.selector.sources[0]["failed"]
+        return super().copy_job(job)
+
+    def on_chunk_copied(self, size):
+        super().on_chunk_copied(size)
+        if self.reading_lost and self.copied_size >= 2 * MB:
+            self.reading_lost = False
+            raise OSError(errno.EIO, "Ошибка ввода-вывода")
+
+
+def test_failover_to_other_stick_mid_file(make_tree):
+    files = {"Content/big.pak": os.urandom(4 * MB)}
+    usb1, usb2 = make_tree("usb1", files), make_tree("usb2", files)
+    dst = os.path.join(os.path.dirname(usb1), "dst")
+    # Хеш по ходу копирования выключен: проверка перечитывает и источник, и копию
+    engine = LosingEngine([usb1, usb2], dst, lost_root=usb1,
+                          **engine_options(copy_strategy="buffered", hash_while_copying=False))
+    engine.run()
+    assert engine.error is None
+    assert read_tree(dst) == files
+    assert not engine.integrity_report["failed"]
+    lost, spare = engine.source_stats
+    assert lost["failed"] and not spare["failed"]
+    # Вторая флешка дочитала файл с места обрыва, а не с начала
+    assert spare["files"] == 1
+    assert 0 < spare["bytes"] < len(files["Content/big.pak"])
+    assert any("флешка отключена" in error["error"] for error in engine.metrics.errors)
+
+
+def test_stale_copy_on_second_stick_is_not_read(make_tree):
+    files = {f"Content/{i}.pak": os.urandom(256 * 1024) for i in range(6)}
+    usb1 = make_tree("usb1", files)
+    stale = dict(files, **{"Content/0.pak": os.urandom(100 * 1024)})
+    del stale["Content/5.pak"]
+    usb2 = make_tree("usb2", stale)
+    dst = os.path.join(os.path.dirname(usb1), "dst")
+    engine = CopyEngine([usb1, usb2], dst, **engine_options())
+    engine.run()
+    assert engine.error is None
+    assert engine.workers == 2
+    assert engine.selector.sources[1]["files"] == {f"Content/{i}.pak" for i in range(1, 5)}
+    assert read_tree(dst) == files
+    assert not engine.integrity_report["failed"]
+    assert sum(stats["files"] for stats in engine.source_stats) == len(files)
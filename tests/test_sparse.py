@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+import fast_copy
+from fast_copy import SPARSE_BLOCK_SIZE, copy_fd, make_writer, preallocate
+from engine import CopyEngine
+from helpers import read_tree, engine_options
+
+
+def sparse_data():
+    """Данные с нулевыми участками в начале, в середине (не по границе блока) и в конце."""
+    return (
+        bytes(3 * SPARSE_BLOCK_SIZE)
+        + os.urandom(SPARSE_BLOCK_SIZE + 100)
+        + bytes(5 * SPARSE_BLOCK_SIZE)
+        + os.urandom(10)
+        + bytes(2 * SPARSE_BLOCK_SIZE)
+    )
+
+
+def copy_sparse(tmp_path, data, chunk_size=fast_copy.CHUNK_SIZE):
+    src, dst = tmp_path / "src.bin", tmp_path / "dst.bin"
+    src.write_bytes(data)
+    holes = []
+    with open(src, "rb", buffering=0) as f_src, open(dst, "wb", buffering=0) as f_dst:
+        preallocate(f_dst.fileno(), len(data), sparse=True)
+        strategy = copy_fd(f_src.fileno(), f_dst.fileno(), chunk_size=chunk_size, sparse=True, on_hole=holes.append)
+    return dst.read_bytes(), sum(holes), strategy
+
+
+@pytest.mark.skipif(not fast_copy.SPARSE_SUPPORTED, reason="разреженная запись только в POSIX-системах")
+@pytest.mark.parametrize("chunk_size", [fast_copy.CHUNK_SIZE, SPARSE_BLOCK_SIZE + 7])
+def test_sparse_copy_round_trip(tmp_path, chunk_size):
+    data = sparse_data()
+    copied, holes, strategy = copy_sparse(tmp_path, data, chunk_size)
+    assert copied == data
+    assert strategy == "buffered"
+    assert 0 < holes <= data.count(0)
+
+
+def test_sparse_disabled_where_unsupported(tmp_path, monkeypatch):
+    monkeypatch.setattr(fast_copy, "SPARSE_SUPPORTED", False)
+    data = sparse_data()
+    copied, holes, _ = copy_sparse(tmp_path, data)
+    assert copied == data
+    assert holes == 0
+    assert make_writer(True) is fast_copy.write_all
+
+
+def test_sparse_writer_keeps_short_tail(tmp_path):
+    path = tmp_path / "out.bin"
+    data = b"\x01" + bytes(2 * SPARSE_BLOCK_SIZE) + b"\x02"
+    with open(path, "wb", buffering=0) as f:
+        preallocate(f.fileno(), len(data), sparse=True)
+        make_writer(True)(f.fileno(), data)
+    assert path.read_bytes() == data
+
+
+def test_engine_sparse_restore(make_tree):
+    data = sparse_data()
+    src = make_tree("src", {"Content/data.pak": data, "readme.txt": b"text"})
+    dst = os.path.join(os.path.dirname(src), "dst")
+    engine = CopyEngine(src, dst, **engine_options(sparse=True))
+    engine.run()
+    assert engine.error is None
+    assert read_tree(dst) == {"Content/data.pak": data, "readme.txt": b"text"}
+    assert not engine.integrity_report["failed"]
+    if fast_copy.SPARSE_SUPPORTED:
+        assert engine.sparse_bytes > 0
+    else:
+        assert engine.sparse_bytes == 0
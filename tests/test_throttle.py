@@ -0,0 +1,44 @@
+import time
+
+from throttle import AdaptiveThrottle, TokenBucket, make_throttle
+
+
+MB = 1024 * 1024
+
+
+def timed_consume(bucket, size, should_stop=None):
+    start = time.monotonic()
+    bucket.consume(size, should_stop)
+    return time.monotonic() - start
+
+
+def test_make_throttle():
+    assert make_throttle(0) is None
+    bucket = make_throttle(5)
+    assert isinstance(bucket, TokenBucket)
+    assert bucket.rate == 5 * MB
+    adaptive = make_throttle(0, adaptive=True)
+    assert isinstance(adaptive, AdaptiveThrottle)
+    assert adaptive.bucket.rate is None
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(4 * MB)
+    # Ведро начинается пустым: 1 МБ при 4 МБ/с — это четверть секунды
+    assert 0.2 <= timed_consume(bucket, MB) < 1.0
+    bucket.set_rate(None)
+    assert timed_consume(bucket, 100 * MB) < 0.05
+
+
+def test_token_bucket_burst_is_capped():
+    bucket = TokenBucket(4 * MB, burst_seconds=0.25)
+    time.sleep(0.3)
+    bucket.consume(0)
+    # После простоя накоплено не больше burst, а не весь простой
+    assert bucket.tokens <= bucket.burst == MB
+
+
+def test_token_bucket_wait_stops_on_cancel():
+    bucket = TokenBucket(MB)
+    # Без отмены ожидание заняло бы 10 с
+    assert timed_consume(bucket, 10 * MB, should_stop=lambda: True) < 0.5
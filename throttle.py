@@ -0,0 +1,185 @@
+import sys
+import time
+import threading
+import psutil
+
+
+# Максимальная длительность одного ожидания, с: чаще проверяем, не отменено ли копирование
+_SLEEP_SLICE = 0.1
+
+
+class TokenBucket:
+    """Ограничивает скорость копирования алгоритмом «ведро токенов».
+
+    Каждый скопированный байт расходует токен, токены пополняются со скоростью
+    rate байт в секунду, но накапливаются не больше чем на burst байт. Если
+    токенов не хватает, consume() ждет, пока долг не будет погашен, поэтому
+    средняя скорость всех потоков вместе не превышает rate. rate=None снимает
+    ограничение.
+    """
+
+    def __init__(self, rate=None, burst_seconds=0.25):
+        self.burst_seconds = burst_seconds
+        self.rate = None
+        self.burst = 0
+        self.tokens = 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        """Меняет предельную скорость, байт/с (None — без ограничения)."""
+        with self._lock:
+            self._refill()
+            self.rate = float(rate) if rate else None
+            self.burst = max(64 * 1024, self.rate * self.burst_seconds) if self.rate else 0
+            self.tokens = min(self.tokens, self.burst)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def consume(self, size, should_stop=None):
+        """Расходует size байт и ждет, если скорость превышена.
+
+        should_stop() проверяется во время ожидания, чтобы отмена не ждала,
+        пока ограничитель пропустит очередной блок.
+        """
+        with self._lock:
+            if not self.rate:
+                return
+            self._refill()
+            self.tokens -= size
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        deadline = time.monotonic() + wait
+        while wait > 0:
+            if should_stop is not None and should_stop():
+                return
+            time.sleep(min(wait, _SLEEP_SLICE))
+            wait = deadline - time.monotonic()
+
+
+class AdaptiveThrottle:
+    """Снижает скорость копирования, когда диск или процессор нужны другим программам.
+
+    Раз в interval секунд через psutil снимаются общесистемные счетчики
+    дискового ввода-вывода и загрузка процессора. Чужой ввод-вывод — это
+    общий объем за вычетом ввода-вывода нашего процесса. Если он выше
+    io_threshold байт/с или процессор загружен больше cpu_threshold процентов,
+    скорость копирования уменьшается вдвое (но не ниже min_rate), иначе плавно
+    растет обратно до max_rate, а при max_rate=None ограничение снимается,
+    как только перестает сдерживать копирование.
+    """
+
+    def __init__(self, bucket, max_rate=None, min_rate=1024 * 1024,
+                 io_threshold=10 * 1024 * 1024, cpu_threshold=85.0, interval=1.0):
+        self.bucket = bucket
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.io_threshold = io_threshold
+        self.cpu_threshold = cpu_threshold
+        self.interval = interval
+        self.throttled_intervals = 0
+        self._process = psutil.Process()
+        self._consumed = 0
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._last_disk = self._disk_bytes()
+        self._last_own = self._own_bytes()
+        psutil.cpu_percent(None)  # Первый вызов только запоминает точку отсчета
+
+    def consume(self, size, should_stop=None):
+        """Расходует size байт, при необходимости пересчитывая допустимую скорость."""
+        with self._lock:
+            self._consumed += size
+            now = time.monotonic()
+            if now - self._last_check >= self.interval:
+                self._adjust(now)
+        self.bucket.consume(size, should_stop)
+
+    def _disk_bytes(self):
+        counters = psutil.disk_io_counters()
+        if counters is None:
+            return None
+        return counters.read_bytes + counters.write_bytes
+
+    def _own_bytes(self):
+        try:
+            counters = self._process.io_counters()
+            return counters.read_bytes + counters.write_bytes
+        except (AttributeError, psutil.Error):
+            # Нет счетчиков процесса (macOS): каждый байт читается и записывается
+            return self._consumed * 2
+
+    def _adjust(self, now):
+        """Сравнивает нагрузку за прошедший интервал с порогами и меняет скорость."""
+        elapsed = now - self._last_check
+        disk = self._disk_bytes()
+        own = self._own_bytes()
+        own_rate = (own - self._last_own) / elapsed
+        foreign_rate = 0.0
+        if disk is not None and self._last_disk is not None:
+            foreign_rate = max(0.0, (disk - self._last_disk) / elapsed - own_rate)
+        cpu = psutil.cpu_percent(None)
+        self._last_check, self._last_disk, self._last_own = now, disk, own
+
+        rate = self.bucket.rate
+        # Копирование и читает, и пишет каждый байт
+        copy_rate = own_rate / 2
+        if foreign_rate > self.io_threshold or cpu > self.cpu_threshold:
+            self.throttled_intervals += 1
+            rate = max(self.min_rate, (rate or copy_rate) / 2)
+        elif rate is not None:
+            rate *= 1.25
+            if self.max_rate is not None:
+                rate = min(rate, self.max_rate)
+            elif copy_rate < rate / 2:
+                # Ограничение больше не сдерживает копирование
+                rate = None
+        self.bucket.set_rate(rate)
+
+
+def make_throttle(limit_mb=0, adaptive=False):
+    """Создает ограничитель скорости для копирования или None, если он не нужен.
+
+    limit_mb — предельная скорость, МБ/с (0 — без ограничения); adaptive
+    включает подстройку скорости под нагрузку на систему.
+    """
+    max_rate = limit_mb * 1024 * 1024 if limit_mb and limit_mb > 0 else None
+    if max_rate is None and not adaptive:
+        return None
+    bucket = TokenBucket(max_rate)
+    if adaptive:
+        return AdaptiveThrottle(bucket, max_rate)
+    return bucket
+
+
+def lower_priority(io=False, cpu=False):
+    """Понижает приоритет ввода-вывода и процессора для текущего потока.
+
+    В Linux приоритеты задаются для отдельных потоков и наследуются потоками,
+    созданными позже, поэтому функция вызывается в начале потока копирования.
+    В Windows меняется приоритет всего процесса. Если ОС не поддерживает
+    изменение приоритета, оно молча пропускается.
+    """
+    if not io and not cpu:
+        return
+    if sys.platform.startswith("linux"):
+        proc = psutil.Process(threading.get_native_id())
+    else:
+        proc = psutil.Process()
+    if io:
+        try:
+            if sys.platform == "win32":
+                proc.ionice(psutil.IOPRIO_LOW)
+            else:
+                proc.ionice(psutil.IOPRIO_CLASS_BE, 7)
+        except (AttributeError, psutil.Error, OSError):
+            pass
+    if cpu:
+        try:
+            proc.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS if sys.platform == "win32" else 10)
+        except (AttributeError, psutil.Error, OSError):
+            pass
@@ -4,6 +4,7 @@ import time
 import subprocess
 import psutil
 from collections import defaultdict
+from contextlib import nullcontext
 from PyQt5.QtWidgets import (
     QMainWindow, QStatusBar, QProgressBar, QLabel, QPushButton, QVBoxLayout, QWidget, QMessageBox, QFileDialog, QLineEdit, QHBoxLayout, QFrame, QGroupBox, QDesktopWidget
 )
@@ -11,16 +12,20 @@ from PyQt5.QtCore import QTimer, QFileSystemWatcher, Qt
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWinExtras import QWinTaskbarButton
 from copy_thread import CopyThread
+from bundle import find_library_sources
+from metrics import METRICS_REPORT, RestoreMetrics
+from planner import THROUGHPUT_LOG
+from profiling import start_profiler
 from utils import *
 
 
 class MainWindow(QMainWindow):
-    def __init__(self):
-        """Инициализация главного окна."""
+    def __init__(self, profile_dir=None):
+        """Инициализация главного окна; profile_dir включает профилирование (см. profiling.py)."""
         super().__init__()
         self.setWindowTitle("Epic Games ReStore")
         self.setWindowIcon(QIcon(":/icon.ico"))
-        self.setFixedSize(400, 460)
+        self.setFixedSize(400, 490)
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowMaximizeButtonHint)
         self.center_window()
 
@@ -28,6 +33,7 @@ class MainWindow(QMainWindow):
         self._init_variables()
         self._init_timers()
         self._load_settings()
+        self._init_profiling(profile_dir)
 
     def center_window(self):
         """Размещение окна в центре экрана."""
@@ -44,7 +50,7 @@ class MainWindow(QMainWindow):
         self.epic_path_button.clicked.connect(self.select_epic_path)
         self.epic_path_button.setFixedSize(30, 20)
 
-        self.usb_path_label = QLabel("Путь к каталогу на флешке:", self)
+        self.usb_path_label = QLabel("Пути к каталогам на флешках (через ;):", self)
         self.usb_path_input = QLineEdit(self)
         self.usb_path_button = QPushButton("...", self)
         self.usb_path_button.clicked.connect(self.select_usb_path)
@@ -64,6 +70,12 @@ class MainWindow(QMainWindow):
         self.stop_button.clicked.connect(self.stop_monitoring)
         self.stop_button.setEnabled(False)
         self.status_label = QLabel("", self)
+        self.pause_button = QPushButton("Пауза", self)
+        self.pause_button.clicked.connect(self.toggle_pause)
+        self.pause_button.setEnabled(False)
+        self.cancel_button = QPushButton("Отменить копирование", self)
+        self.cancel_button.clicked.connect(self.cancel_copy)
+        self.cancel_button.setEnabled(False)
 
         self.status_bar = QStatusBar()
         self.status_bar.setStyleSheet("""
@@ -83,7 +95,7 @@ class MainWindow(QMainWindow):
         self.test_launch_button = QPushButton("Запустить Epic Games", self)
         self.test_launch_button.clicked.connect(self.resume_epic)
         self.test_stop_button = QPushButton("Закрыть Epic Games", self)
-        self.test_stop_button.clicked.connect(self.stop_epic)
+        self.test_stop_button.clicked.connect(lambda: self.stop_epic())
         self.test_games_button = QPushButton("Список установленных игр", self)
         self.test_games_button.clicked.connect(lambda: show_games_info(*get_installed_games()))
         #self.test_create_button = QPushButton("[Создать тестовую папку и файл]", self)
@@ -110,6 +122,10 @@ class MainWindow(QMainWindow):
         usb_layout.addWidget(self.usb_path_input)
         usb_layout.addWidget(self.usb_path_button)
 
+        copy_buttons_layout = QHBoxLayout()
+        copy_buttons_layout.addWidget(self.cancel_button)
+        copy_buttons_layout.addWidget(self.pause_button)
+
         monitoring_buttons_layout = QHBoxLayout()
         monitoring_buttons_layout.addWidget(self.stop_button)
         monitoring_buttons_layout.addWidget(self.start_button)
@@ -123,6 +139,7 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.line)
         layout.addWidget(self.progress_bar)
         layout.addWidget(self.status_label)
+        layout.addLayout(copy_buttons_layout)
         layout.addLayout(monitoring_buttons_layout)
         layout.addWidget(self.utilities_group)
 
@@ -133,17 +150,23 @@ class MainWindow(QMainWindow):
     def _init_variables(self):
         """Инициализация переменных."""
         self.epic_path = self.detect_epic_path()
-        self.usb_path = self.get_farthest_drive()
+        self.usb_paths = [self.get_farthest_drive()]
         self.watcher = QFileSystemWatcher()
         self.tracked_folders = set()
         self.copy_thread = None
         self.new_folder_path = None
-        self.usb_source_path = None
+        self.usb_sources = None
         self.timer = QTimer()
         self.delay_seconds = 5
         self.remaining_delay = self.delay_seconds
         self.epic_closed = False
         self.is_copying = False
+        self.copy_options = {}
+        self.fanout_libraries = False
+        self.metrics = None
+        self.last_summary = ""
+        self.profile_dir = None
+        self.profiler = None
 
     def _init_timers(self):
         """Инициализация таймеров."""
@@ -164,21 +187,35 @@ class MainWindow(QMainWindow):
                 with open(self.settings_file, "r", encoding="utf-8") as f:
                     settings = json.load(f)
                     self.epic_path = settings.get("epic_path", "")
-                    self.usb_path = settings.get("usb_path", "")
+                    # Раньше флешка была одна и хранилась в usb_path
+                    self.usb_paths = settings.get("usb_paths") or [settings.get("usb_path", "")]
+                    self.copy_options = settings.get("copy", {})
+                    self.fanout_libraries = settings.get("fanout_libraries", False)
+                    self.profile_dir = settings.get("profile_dir")
             except Exception as e:
                 QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить настройки: {e}")
                 self.epic_path = self.detect_epic_path()
-                self.usb_path = self.get_farthest_drive()
+                self.usb_paths = [self.get_farthest_drive()]
         else:
             self.epic_path = self.detect_epic_path()
-            self.usb_path = self.get_farthest_drive()
+            self.usb_paths = [self.get_farthest_drive()]
 
         self.epic_path_input.setText(self.epic_path)
-        self.usb_path_input.setText(self.usb_path)
+        self.usb_path_input.setText("; ".join(self.usb_paths))
+
+    def _init_profiling(self, profile_dir):
+        """Оборачивает обработчики изменений каталога профилировщиком, если профилирование включено."""
+        self.profiler = start_profiler(profile_dir or self.profile_dir)
+        if self.profiler is None:
+            return
+        # Обработчики подключаются к сигналам позже, в start_monitoring, — уже обернутыми
+        self.on_directory_changed = self.profiler.wrap("on_directory_changed", self.on_directory_changed)
+        self.check_files_in_folder = self.profiler.wrap("check_files_in_folder", self.check_files_in_folder)
+        self.status_bar.showMessage(f"⏱ Профилирование включено: {os.path.abspath(self.profiler.directory)}")
 
     def simulate_copy_finish(self):
         """Симулирует завершение копирования и проверки."""
-        self.update_progress(100, 0.0, 0.0, self.copy_thread.copied_files if self.copy_thread else 0)
+        self.update_progress(100, 0.0, 0.0, self.copy_thread.engine.copied_files if self.copy_thread else 0)
         self.update_integrity_progress(100)
         self.on_copy_finished()
         QMessageBox.information(self, "Успех", "Симуляция завершения копирования выполнена.")
@@ -200,7 +237,10 @@ class MainWindow(QMainWindow):
         """Сохраняет текущие настройки в файл."""
         settings = {
             "epic_path": self.epic_path_input.text(),
-            "usb_path": self.usb_path_input.text(),
+            "usb_paths": self.read_usb_paths(),
+            "copy": self.copy_options,
+            "fanout_libraries": self.fanout_libraries,
+            "profile_dir": self.profile_dir,
         }
         try:
             with open(self.settings_file, "w", encoding="utf-8") as f:
@@ -208,6 +248,10 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить настройки: {e}")
 
+    def read_usb_paths(self):
+        """Возвращает каталоги на флешках из поля ввода (пути разделяются точкой с запятой)."""
+        return [path.strip() for path in self.usb_path_input.text().split(";") if path.strip()]
+
     def set_widgets_enabled(self, enabled):
         """Включает или отключает виджеты для выбора путей."""
         self.epic_path_input.setEnabled(enabled)
@@ -251,16 +295,22 @@ class MainWindow(QMainWindow):
             self.save_settings()
 
     def select_usb_path(self):
-        """Открывает диалог выбора каталога на флешке."""
-        path = QFileDialog.getExistingDirectory(self, "Выберите каталог на флешке", self.usb_path)
-        if path:
-            self.usb_path = path
-            self.usb_path_input.setText(path)
+        """Открывает диалог выбора каталога на флешке и добавляет его к списку."""
+        self.usb_paths = self.read_usb_paths()
+        start_dir = self.usb_paths[-1] if self.usb_paths else ""
+        path = QFileDialog.getExistingDirectory(self, "Выберите каталог на флешке", start_dir)
+        if path and path not in self.usb_paths:
+            self.usb_paths.append(path)
+            self.usb_path_input.setText("; ".join(self.usb_paths))
             self.save_settings()
 
     def closeEvent(self, event):
         """Сохраняет настройки при закрытии программы."""
         self.save_settings()
+        if self.copy_thread and self.copy_thread.isRunning():
+            # Дожидаемся отмены, чтобы недописанный файл попал в журнал
+            self.copy_thread.cancel()
+            self.copy_thread.wait()
         event.accept()
 
     def start_monitoring(self):
@@ -268,6 +318,7 @@ class MainWindow(QMainWindow):
         if not os.path.exists(self.epic_path):
             QMessageBox.critical(self, "Ошибка", "Каталог Epic Games не найден!")
             return
+        self.usb_paths = self.read_usb_paths()
         
         existing_folders = set()
         if os.path.exists(self.epic_path):
@@ -302,9 +353,9 @@ class MainWindow(QMainWindow):
                 
                 for folder in new_folders:
                     epic_folder = os.path.join(path, folder)
-                    usb_folder = os.path.join(self.usb_path, folder)
+                    usb_sources = find_library_sources(self.usb_paths, folder)
                     
-                    if os.path.exists(usb_folder):
+                    if usb_sources:
                         self.status_bar.showMessage(f"✅ Найдена папка '{folder}' с совпадением на флешке")
                         self.watcher.addPath(epic_folder)
                         self.tracked_folders.add(folder)
@@ -312,19 +363,19 @@ class MainWindow(QMainWindow):
                                 if os.path.isfile(os.path.join(epic_folder, f))]
                         if files:
                             self.status_bar.showMessage(f"📁 В новой папке есть файлы: '{folder}'")
-                            self.prepare_copy(epic_folder, usb_folder)
+                            self.prepare_copy(epic_folder, usb_sources)
             else:
                 folder_name = os.path.basename(path)
                 if folder_name in self.tracked_folders:
-                    usb_folder = os.path.join(self.usb_path, folder_name)
+                    usb_sources = find_library_sources(self.usb_paths, folder_name)
                     
-                    if os.path.exists(usb_folder):
+                    if usb_sources:
                         files = [f for f in os.listdir(path) 
                                 if os.path.isfile(os.path.join(path, f))]
                         
                         if files:
                             self.status_bar.showMessage(f"📁 Обнаружены файлы в '{folder_name}'")
-                            self.prepare_copy(path, usb_folder)
+                            self.prepare_copy(path, usb_sources)
 
         except Exception as e:
             error_msg = f"⚠️ Ошибка: {str(e)}"
@@ -365,23 +416,23 @@ class MainWindow(QMainWindow):
                 new_folders = current_folders - self.tracked_folders
                 for folder in new_folders:
                     epic_folder = os.path.join(path, folder)
-                    usb_folder = os.path.join(self.usb_path, folder)
-                    if os.path.exists(usb_folder):
+                    usb_sources = find_library_sources(self.usb_paths, folder)
+                    if usb_sources:
                         self.status_bar.showMessage(f"✅ Найдена новая папка '{folder}' с совпадением на флешке")
                         self.watcher.addPath(epic_folder)
                         self.tracked_folders.add(folder)
-                        self.check_files_in_folder(epic_folder, usb_folder)
+                        self.check_files_in_folder(epic_folder, usb_sources)
             else:
                 folder_name = os.path.basename(path)
                 if folder_name in self.tracked_folders:
-                    usb_folder = os.path.join(self.usb_path, folder_name)
-                    if os.path.exists(usb_folder):
-                        self.check_files_in_folder(path, usb_folder)
+                    usb_sources = find_library_sources(self.usb_paths, folder_name)
+                    if usb_sources:
+                        self.check_files_in_folder(path, usb_sources)
         except Exception as e:
             error_msg = f"⚠️ Ошибка: {str(e)}"
             self.status_bar.showMessage(error_msg)
 
-    def check_files_in_folder(self, epic_folder, usb_folder):
+    def check_files_in_folder(self, epic_folder, usb_sources):
         """Проверяет файлы в папке, включая скрытые."""
         try:
             items = os.listdir(epic_folder)
@@ -401,20 +452,21 @@ class MainWindow(QMainWindow):
             folder_name = os.path.basename(epic_folder)
             if has_files:
                 self.status_bar.showMessage(f"📁 Обнаружены файлы в папке '{folder_name}'")
-                self.prepare_copy(epic_folder, usb_folder)
+                self.prepare_copy(epic_folder, usb_sources)
             else:
                 self.status_bar.showMessage(f"ℹ️ Папка '{folder_name}' пока не содержит файлов")
         except Exception as e:
             self.status_bar.showMessage(f"⚠️ Ошибка проверки папки: {str(e)}")
 
-    def prepare_copy(self, epic_folder, usb_folder):
+    def prepare_copy(self, epic_folder, usb_sources):
         """Подготовка к копированию после обнаружения файлов."""
         try:
             self.new_folder_path = epic_folder
-            self.usb_source_path = usb_folder
+            self.usb_sources = usb_sources
             self.last_change_time = time.time()
             
             if not self.stability_timer.isActive():
+                self.job_metrics().start_phase("stability_wait")
                 self.stability_timer.start(1000)
                 folder_name = os.path.basename(epic_folder)
                 self.status_bar.showMessage(f"⏳ Обнаружены файлы в '{folder_name}'. Ожидание стабильности...")
@@ -427,14 +479,15 @@ class MainWindow(QMainWindow):
         time_diff = current_time - self.last_change_time
         if time_diff >= self.stability_delay:
             self.stability_timer.stop()
+            self.job_metrics().end_phase("stability_wait")
             folder_name = os.path.basename(self.new_folder_path)
             if not self.epic_closed:
                 self.status_bar.showMessage(f"🛑 Закрываем Epic Games для '{folder_name}'...")
-                self.stop_epic()
+                self.stop_epic(self.job_metrics())
                 self.epic_closed = True
                 time.sleep(1)
             self.status_bar.showMessage(f"🚀 Начинаем копирование '{folder_name}'...")
-            self.start_copy(self.usb_source_path, self.new_folder_path)
+            self.start_copy(self.usb_sources, self.new_folder_path)
         else:
             remaining = int(self.stability_delay - time_diff)
             self.status_bar.showMessage(f"⏳ Ожидание стабильности: {remaining} сек...")
@@ -446,16 +499,21 @@ class MainWindow(QMainWindow):
         if self.remaining_delay <= 0:
             self.timer.stop()
             if not self.epic_closed:
-                self.stop_epic()
+                self.stop_epic(self.job_metrics())
                 self.epic_closed = True
-            self.start_copy(self.usb_path, self.new_folder_path)
+            self.start_copy(self.usb_paths, self.new_folder_path)
+
+    def stop_epic(self, metrics=None):
+        """Останавливает Epic Games Store.
 
-    def stop_epic(self):
-        """Останавливает Epic Games Store."""
+        metrics передаются только при восстановлении: тогда время закрытия
+        записывается этапом launcher_kill, а закрытие кнопкой в метрики не попадает.
+        """
         try:
-            for proc in psutil.process_iter(['pid', 'name']):
-                if proc.info['name'] == 'EpicGamesLauncher.exe':
-                    proc.kill()
+            with metrics.phase("launcher_kill") if metrics else nullcontext():
+                for proc in psutil.process_iter(['pid', 'name']):
+                    if proc.info['name'] == 'EpicGamesLauncher.exe':
+                        proc.kill()
             QMessageBox.information(self, "Успех", "Epic Games Store остановлен.")
         except psutil.NoSuchProcess:
             QMessageBox.critical(self, "Ошибка", "Процесс Epic Games Launcher не найден.")
@@ -464,11 +522,43 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Произошла непредвиденная ошибка: {e}")
 
+    def job_metrics(self):
+        """Возвращает метрики текущего восстановления, начиная новые при первом обращении."""
+        if self.metrics is None:
+            self.metrics = RestoreMetrics()
+        return self.metrics
+
+    def finish_metrics(self):
+        """Показывает сводку метрик завершенного восстановления и готовит метрики для следующего."""
+        if self.metrics is None:
+            return ""
+        self.last_summary = self.metrics.summary()
+        self.metrics = None
+        return self.last_summary
+
+    def copy_destinations(self, dst):
+        """Возвращает папки, в которые восстанавливается игра.
+
+        При включенном fanout_libraries игра за одно чтение флешки пишется еще и
+        во все остальные библиотеки Epic Games, где установлены игры.
+        """
+        if not self.fanout_libraries:
+            return dst
+        installed_games, _ = get_installed_games()
+        name = os.path.basename(os.path.normpath(dst))
+        parent = os.path.normcase(os.path.dirname(os.path.normpath(dst)))
+        destinations = [dst]
+        for root in get_unique_game_paths(installed_games):
+            if os.path.normcase(os.path.normpath(root)) != parent:
+                destinations.append(os.path.join(root, name))
+        return destinations
+
     def start_copy(self, src, dst):
         """Начинает копирование."""
         try:
-            if not os.path.exists(src):
-                error_msg = f"❌ Ошибка: исходная папка не найдена на флешке: {src}"
+            sources = [src] if isinstance(src, str) else src
+            if not any(os.path.exists(path) for path in sources):
+                error_msg = f"❌ Ошибка: исходная папка не найдена на флешке: {'; '.join(sources)}"
                 self.status_bar.showMessage(error_msg)
                 QMessageBox.critical(self, "Ошибка", error_msg)
                 return
@@ -485,20 +575,106 @@ class MainWindow(QMainWindow):
                 QMessageBox.critical(self, "Ошибка", error_msg)
                 return
 
-            folder_name = os.path.basename(src)
+            folder_name = os.path.basename(sources[0])
             self.status_bar.showMessage(f"📊 Подготовка к копированию '{folder_name}'...")
+
+            # Поток создается до смены состояния окна: при ошибке в параметрах
+            # копирования из settings.json слежение за папкой продолжается
+            options = {"throughput_log": THROUGHPUT_LOG, "metrics_report": METRICS_REPORT}
+            options.update(self.copy_options)
+            self.copy_thread = CopyThread(
+                src, self.copy_destinations(dst), metrics=self.job_metrics(), profiler=self.profiler,
+                **options
+            )
+            self.copy_thread.progress_updated.connect(self.update_progress)
+            self.copy_thread.integrity_check_progress.connect(self.update_integrity_progress)
+            self.copy_thread.integrity_check_finished.connect(self.on_integrity_checked)
+            self.copy_thread.copy_finished.connect(self.on_copy_finished)
+            self.copy_thread.copy_cancelled.connect(self.on_copy_cancelled)
+            self.copy_thread.copy_failed.connect(self.on_copy_failed)
             self.is_copying = True
             self.watcher.removePath(self.epic_path)
-            # ... остальной код метода
+            self.taskbar_progress.setVisible(True)
+            self.set_copy_controls_enabled(True)
+            self.copy_thread.start()
         except Exception as e:
             error_msg = f"❌ Ошибка при подготовке к копированию: {str(e)}"
             self.status_bar.showMessage(error_msg)
             QMessageBox.critical(self, "Ошибка", error_msg)
 
+    def set_copy_controls_enabled(self, enabled):
+        """Включает или отключает кнопки управления копированием."""
+        self.pause_button.setText("Пауза")
+        self.pause_button.setEnabled(enabled)
+        self.cancel_button.setEnabled(enabled)
+
+    def toggle_pause(self):
+        """Приостанавливает или продолжает копирование."""
+        if not self.copy_thread:
+            return
+        if self.copy_thread.is_paused():
+            self.copy_thread.resume()
+            self.pause_button.setText("Пауза")
+            self.status_bar.showMessage("▶️ Копирование продолжено")
+        else:
+            self.copy_thread.pause()
+            self.pause_button.setText("Продолжить")
+            self.status_bar.showMessage("⏸ Копирование приостановлено")
+
+    def cancel_copy(self):
+        """Отменяет копирование после подтверждения."""
+        if not self.copy_thread:
+            return
+        answer = QMessageBox.question(
+            self, "Отмена копирования",
+            "Отменить копирование? Уже скопированные файлы останутся, "
+            "при следующем запуске копирование продолжится с места остановки."
+        )
+        if answer == QMessageBox.Yes:
+            self.copy_thread.cancel()
+            self.cancel_button.setEnabled(False)
+            self.pause_button.setEnabled(False)
+            self.status_bar.showMessage("⏹ Отмена копирования...")
+
+    def reset_copy_state(self):
+        """Возвращает интерфейс в исходное состояние после прерванного копирования."""
+        self.set_copy_controls_enabled(False)
+        self.is_copying = False
+        self.watcher.addPath(self.epic_path)
+        self.progress_bar.setValue(0)
+        self.status_label.setText("")
+        self.taskbar_progress.setVisible(False)
+
+    def on_copy_cancelled(self):
+        """Завершение отмененного копирования."""
+        self.reset_copy_state()
+        self.status_bar.showMessage(f"⏹ Копирование отменено ({self.finish_metrics()})")
+
+    def on_copy_failed(self, error_msg):
+        """Показывает ошибку копирования; сигнал приходит в основной поток, поэтому окно можно открыть здесь."""
+        self.reset_copy_state()
+        self.finish_metrics()
+        self.status_bar.showMessage(f"❌ {error_msg}")
+        QMessageBox.critical(self, "Ошибка", error_msg)
+
     def on_copy_finished(self):
-        """Завершение копирования."""
-        folder_name = os.path.basename(self.usb_source_path) if self.usb_source_path else "unknown"
-        self.status_bar.showMessage(f"✅ Успешно скопировано: '{folder_name}'")
+        """Завершение копирования.
+
+        Если проверка целостности нашла испорченные файлы, Epic Games не
+        запускается, чтобы не играть в битую игру: окно с ошибками уже
+        показано в on_integrity_checked.
+        """
+        folder_name = os.path.basename(self.usb_sources[0]) if self.usb_sources else "unknown"
+        report = self.copy_thread.engine.integrity_report if self.copy_thread else None
+        if report and report["failed"]:
+            self.reset_copy_state()
+            self.status_bar.showMessage(
+                f"❌ '{folder_name}' скопирована с ошибками: {len(report['failed'])} файлов не прошли проверку "
+                f"целостности, Epic Games не запущен ({self.finish_metrics()})"
+            )
+            return
+        self.set_copy_controls_enabled(False)
+        self.status_bar.showMessage(f"✅ Успешно скопировано: '{folder_name}' ({self.finish_metrics()})")
         self.is_copying = False
         self.watcher.addPath(self.epic_path)
         QTimer.singleShot(2000, lambda: (
@@ -506,14 +682,18 @@ class MainWindow(QMainWindow):
             self.resume_epic()
         ))
 
-    def update_progress(self, progress, speed, remaining_files, total_files, remaining_time):
+    def update_progress(self, progress, speed, remaining_files, total_files, remaining_time,
+                        skipped_files=0, skipped_size=0):
         """Обновляет прогресс копирования."""
         self.progress_bar.setValue(progress)
-        self.status_label.setText(
+        text = (
             f"Скорость: {speed:.2f} МБ/с\n"
             f"Файлов: {total_files - remaining_files}/{total_files}\n"
             f"Осталось: {remaining_time}"
         )
+        if skipped_files:
+            text += f"\nПропущено без изменений: {skipped_files} ({skipped_size / (1024 * 1024):.1f} МБ)"
+        self.status_label.setText(text)
         self.taskbar_progress.setValue(progress)
 
     def update_integrity_progress(self, progress):
@@ -525,6 +705,22 @@ class MainWindow(QMainWindow):
         )
         self.taskbar_progress.setValue(progress)
 
+    def on_integrity_checked(self, report):
+        """Показывает итог проверки целостности одним сообщением."""
+        failed = report["failed"]
+        if not failed:
+            self.status_bar.showMessage(f"✅ Проверка целостности пройдена: {report['passed']} файлов")
+            return
+
+        self.status_bar.showMessage(f"❌ Не прошли проверку целостности: {len(failed)} из {report['checked']}")
+        lines = [f"{item['path']}: {item['error']}" for item in failed[:20]]
+        if len(failed) > 20:
+            lines.append(f"... и еще {len(failed) - 20}")
+        QMessageBox.critical(
+            self, "Ошибка",
+            f"Файлов не прошли проверку целостности: {len(failed)} из {report['checked']}\n\n" + "\n".join(lines)
+        )
+
     def resume_epic(self):
         """Возобновляет загрузку через консольную команду."""
         try:
@@ -538,7 +734,7 @@ class MainWindow(QMainWindow):
         self.stop_monitoring()
         self.progress_bar.setValue(0)
         self.status_label.setText("")
-        self.status_bar.showMessage("⏳ Ожидание")
+        self.status_bar.showMessage(f"⏳ Ожидание. Последнее восстановление: {self.last_summary}")
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.taskbar_progress.setVisible(False)